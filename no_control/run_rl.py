@@ -1,15 +1,26 @@
-import traci
 import sys
 import os
 import numpy as np
 import matplotlib.pyplot as plt
 
+# Path setup (shared helpers live in with_traffic_light/dqn_model)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "with_traffic_light"))
+from dqn_model.detector_registry import load_layout
+from dqn_model.aggregator import DetectorAggregator
+from dqn_model.result_cache import baseline_series
+
 # 1. Configuration
 sumoBinary = "sumo" # Use "sumo" for command line only (faster)
 sumoCmd = [sumoBinary, "-c", "simulation.sumocfg"] # Replace with your config name
+MAX_STEPS = 3600 # Run for 1 hour (3600 seconds)
+
+# 2. Get the no-control run (simulated once, then read from the baseline cache)
+series = baseline_series(sumoCmd, MAX_STEPS)
 
-# 2. Start the simulation
-traci.start(sumoCmd)
+# Detectors and ramp lanes are averaged in place over each interval
+control_interval = 30
+layout = load_layout(sumoCmd[2])
+aggregator = DetectorAggregator(layout.group_sizes)
 
 queue_history = []
 speed15m_history = []
@@ -19,99 +30,18 @@ occ15m_history = []
 occ225m_history = []
 occ475m_history = []
 
-speed15m_15s = []
-speed225m_15s = []
-speed475m_15s = []
-occ15m_15s = []
-occ225m_15s = []
-occ475m_15s = []
+# 3. Replay the recorded detector readings
+for step in range(MAX_STEPS):
 
-queue_15s = []
-
-# 3. The Control Loop
-step = 0
-control_interval = 30
-cumulative_vehicle_count = 0
-
-while step < 3600: # Run for 1 hour (3600 seconds)
-
-    # --- PHASE 1: GET STATE ---
-    # Get speed (m/s) and occupancy (%) from the merge detector
-    speed_15m_0 = traci.inductionloop.getLastStepMeanSpeed("det_loc1_0")
-    speed_15m_1 = traci.inductionloop.getLastStepMeanSpeed("det_loc1_1")
-    speed_15m_2 = traci.inductionloop.getLastStepMeanSpeed("det_loc1_2")
-    speed_15m_3 = traci.inductionloop.getLastStepMeanSpeed("det_loc1_3")
-    speed_15m_4 = traci.inductionloop.getLastStepMeanSpeed("det_loc1_4")
-    speed_15m = (speed_15m_0+speed_15m_1+speed_15m_2+speed_15m_3+speed_15m_4)/5
-
-    occ_15m_0 = traci.inductionloop.getLastStepOccupancy("det_loc1_0")
-    occ_15m_1 = traci.inductionloop.getLastStepOccupancy("det_loc1_1")
-    occ_15m_2 = traci.inductionloop.getLastStepOccupancy("det_loc1_2")
-    occ_15m_3 = traci.inductionloop.getLastStepOccupancy("det_loc1_3")
-    occ_15m_4 = traci.inductionloop.getLastStepOccupancy("det_loc1_4")
-    occ_15m = (occ_15m_0+occ_15m_1+occ_15m_2+occ_15m_3+occ_15m_4)/5
-
-    # Get data from 225m detector
-    speed_225m_0 = traci.inductionloop.getLastStepMeanSpeed("det_loc2_0")
-    speed_225m_1 = traci.inductionloop.getLastStepMeanSpeed("det_loc2_1")
-    speed_225m_2 = traci.inductionloop.getLastStepMeanSpeed("det_loc2_2")
-    speed_225m_3 = traci.inductionloop.getLastStepMeanSpeed("det_loc2_3")
-    speed_225m = (speed_225m_0+speed_225m_1+speed_225m_2+speed_225m_3)/4
-
-    occ_225m_0 = traci.inductionloop.getLastStepOccupancy("det_loc2_0")
-    occ_225m_1 = traci.inductionloop.getLastStepOccupancy("det_loc2_1")
-    occ_225m_2 = traci.inductionloop.getLastStepOccupancy("det_loc2_2")
-    occ_225m_3 = traci.inductionloop.getLastStepOccupancy("det_loc2_3")
-    occ_225m = (occ_225m_0+occ_225m_1+occ_225m_2+occ_225m_3)/4
-
-    # Get data from 475m detector
-    speed_475m_0 = traci.inductionloop.getLastStepMeanSpeed("det_loc3_0")
-    speed_475m_1 = traci.inductionloop.getLastStepMeanSpeed("det_loc3_1")
-    speed_475m_2 = traci.inductionloop.getLastStepMeanSpeed("det_loc3_2")
-    speed_475m_3 = traci.inductionloop.getLastStepMeanSpeed("det_loc3_3")
-    speed_475m = (speed_475m_0+speed_475m_1+speed_475m_2+speed_475m_3)/4
-
-    occ_475m_0 = traci.inductionloop.getLastStepOccupancy("det_loc3_0")
-    occ_475m_1 = traci.inductionloop.getLastStepOccupancy("det_loc3_1")
-    occ_475m_2 = traci.inductionloop.getLastStepOccupancy("det_loc3_2")
-    occ_475m_3 = traci.inductionloop.getLastStepOccupancy("det_loc3_3")
-    occ_475m = (occ_475m_0+occ_475m_1+occ_475m_2+occ_475m_3)/4
-
-    if speed_15m != -1 and step>0:
-        speed15m_15s.append(speed_15m)
-    if speed_225m != -1 and step>0:
-        speed225m_15s.append(speed_225m)
-    if speed_475m != -1 and step>0:
-        speed475m_15s.append(speed_475m)
-
-    occ15m_15s.append(occ_15m)
-    occ225m_15s.append(occ_225m)
-    occ475m_15s.append(occ_475m)
-
-
-    # The paper also uses Ramp Queue Length.
-    # A simple way to get this is checking the lane directly:
-    # 'ramp_lane_id' is the ID of your on-ramp lane (e.g., "ramp_0")
-    queue_length_0 = traci.lane.getLastStepHaltingNumber("edge_ramp_0")
-    queue_length_1 = traci.lane.getLastStepHaltingNumber("edge_ramp_1")
-    queue_length = (queue_length_0+queue_length_1) / 2
-
-    queue_15s.append(queue_length)
+    # Speed (m/s), occupancy (%) and counts from the 3 detector groups, plus the ramp queue.
+    # Detectors reporting -1 (no vehicle) are left out of the speed averages.
+    aggregator.update(series["speeds"][step], series["occupancies"][step],
+                      series["counts"][step], series["halting"][step])
 
     if step % control_interval == 0 and step > 0:
-        avg_speed_15m = np.mean(speed15m_15s) if speed15m_15s else 0.0
-        avg_occ_15m = np.mean(occ15m_15s)
-        avg_speed_225m = np.mean(speed225m_15s) if speed225m_15s else 0.0
-        avg_occ_225m = np.mean(occ225m_15s)
-        avg_speed_475m = np.mean(speed475m_15s) if speed475m_15s else 0.0
-        avg_occ_475m = np.mean(occ475m_15s)
-
-        speed15m_15s = []
-        occ15m_15s = []
-        speed225m_15s = []
-        occ225m_15s = []
-        speed475m_15s = []
-        occ475m_15s = []
+        (avg_speed_15m, avg_speed_225m, avg_speed_475m,
+         avg_occ_15m, avg_occ_225m, avg_occ_475m,
+         _, _, _, queue_length) = aggregator.emit()
 
         speed15m_history.append(avg_speed_15m)
         speed225m_history.append(avg_speed_225m)
@@ -120,25 +50,10 @@ while step < 3600: # Run for 1 hour (3600 seconds)
         occ225m_history.append(avg_occ_225m)
         occ475m_history.append(avg_occ_475m)
 
-        queue_length = np.mean(queue_15s)
-
-        queue_15s = []
-
         queue_history.append(queue_length)
 
-    # --- PHASE 2: TAKE ACTION (The Hands) ---
-    n_vehicles = traci.simulation.getMinExpectedNumber()
-
-    cumulative_vehicle_count += n_vehicles
-
-    reward = -cumulative_vehicle_count
-
-    # --- PHASE 3: ADVANCE SIMULATION ---
-    traci.simulationStep() # Tell SUMO to move 1 second forward
-    step += 1
-
-# 4. Close
-traci.close()
+# TTS: vehicles in the network (incl. insertion backlog) summed over every step
+cumulative_vehicle_count = int(series["tts"].sum())
 
 
 print(f"\n\n\n {cumulative_vehicle_count} \n\n") # 1468414
@@ -1,7 +1,13 @@
-import traci
-import numpy as np
+import os
+import sys
 import matplotlib.pyplot as plt
 
+# Path setup (shared helpers live in with_traffic_light/dqn_model)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "with_traffic_light"))
+from dqn_model.detector_registry import load_layout
+from dqn_model.result_cache import baseline_series
+from dqn_model.capacity_drop import from_series, oblique_curves, travel_time_shifts, align, detect_capacity_drop
+
 # =========================
 # CONFIG
 # =========================
@@ -15,95 +21,43 @@ SIM_END = 2250
 # background flow from paper
 q0 = 8160 / 3600.0   # veh/sec
 
-# detector groups
+# detector groups (from the detector registry, in upstream -> downstream order)
+LOCATION_LABELS = ["+920 m (upstream)", "+1225 m (downstream1)", "+1475 m (downstream2)"]
+layout = load_layout(SUMO_CONFIG)
 detector_groups = {
-    "+920 m (upstream)": [
-        "det_loc1_0","det_loc1_1","det_loc1_2","det_loc1_3","det_loc1_4"
-    ],
-    "+1225 m (downstream1)": [
-        "det_loc2_0","det_loc2_1","det_loc2_2","det_loc2_3"
-    ],
-    "+1475 m (downstream2)": [
-        "det_loc3_0","det_loc3_1","det_loc3_2","det_loc3_3"
-    ]
-}
-
-# downstream travel time shifts from paper
-time_shift = {
-    "+920 m (upstream)": 0,
-    "+1225 m (downstream1)": 16,
-    "+1475 m (downstream2)": 25
+    label: g.detector_ids for label, g in zip(LOCATION_LABELS, layout.groups)
 }
 
 # =========================
-# START SUMO
+# NO-CONTROL RUN (simulated once, then read from the baseline cache)
 # =========================
 
-traci.start([SUMO_BINARY, "-c", SUMO_CONFIG])
-
-times = []
-cumulative = {k: 0 for k in detector_groups}
-records = {k: [] for k in detector_groups}
+series = baseline_series([SUMO_BINARY, "-c", SUMO_CONFIG], int(SIM_END / STEP_LENGTH))
 
-# =========================
-# SIM LOOP
-# =========================
-
-cumulative = {k: 0 for k in detector_groups}
-records = {k: [] for k in detector_groups}
-times = []
-
-while traci.simulation.getTime() < SIM_END:
-    traci.simulationStep()
-    t = traci.simulation.getTime()
-    times.append(t)
-
-    for loc, dets in detector_groups.items():
-        step_count = 0
-        for det in dets:
-            # FIX: Only count vehicles that have completely passed to avoid double-counting
-            step_count += traci.inductionloop.getLastStepVehicleNumber(det) 
-            # Note: If values are still high, use: len(traci.inductionloop.getPassedVehiclesID(det))
-        
-        cumulative[loc] += step_count
-        records[loc].append(cumulative[loc])
+times, counts, occupancy = from_series(series, layout)
+delta_t = times[1] - times[0]
 
 # =========================
 # POST PROCESS
 # =========================
 
-times = np.array(times)
-
-modified_curves = {}
-
-lane_count = {
-    "+920 m (upstream)": 5,
-    "+1225 m (downstream1)": 4,
-    "+1475 m (downstream2)": 4
-}
-
-for loc in records:
-
-    N = np.array(records[loc])
-
-    # convert to per-lane cumulative
-    N = N / lane_count[loc]
-
-    # subtract background flow PER LANE
-    q0_lane = (8160/3600.0) / 4.0   # assuming 4 mainline lanes
-    N_mod = N - q0_lane * times
-
+# N'(x,t) per lane: cumulative counts divided by the lanes of each location,
+# minus the background flow per lane (assuming 4 mainline lanes)
+lane_count = [len(dets) for dets in detector_groups.values()]
+q0_lane = q0 / 4.0
+curves = oblique_curves(times, counts, q0_lane, lanes=lane_count)
 
-    # shift downstream curves left
-    shift_steps = int(time_shift[loc] / STEP_LENGTH)
+# downstream travel time shifts, estimated from the data (paper: 16 s and 25 s)
+shifts = travel_time_shifts(counts, delta_t)
+t_mod, curves = align(times, curves, shifts, delta_t)
+modified_curves = {loc: (t_mod, curves[:, i]) for i, loc in enumerate(detector_groups)}
 
-    if shift_steps > 0:
-        N_mod = N_mod[shift_steps:]
-        t_mod = times[:-shift_steps]
-    else:
-        t_mod = times
+drop = detect_capacity_drop(times, counts, occupancy, shifts=shifts)
+print("Travel time shifts (s):", {loc: float(s) for loc, s in zip(detector_groups, shifts)})
+if drop is not None:
+    print(f"Congestion {drop['onset']:.0f}s - {drop['end']:.0f}s | capacity {drop['capacity']:.0f} veh/h | "
+          f"discharge {drop['discharge']:.0f} veh/h | drop {100 * drop['drop']:.1f}%")
 
-    modified_curves[loc] = (t_mod, N_mod)
 # =========================
 # PLOT
 # =========================
@@ -126,9 +80,10 @@ for loc, (t, data) in modified_curves.items():
              label=loc.split(' ')[0], 
              **styles[loc])
 
-# Vertical dashed lines for capacity drop phases (approx 600s and 950s)
-plt.axvline(x=600, color='lightgray', linestyle='--')
-plt.axvline(x=950, color='lightgray', linestyle='--')
+# Vertical dashed lines for the detected congestion onset / end (paper: approx 600s and 950s)
+if drop is not None:
+    plt.axvline(x=drop['onset'], color='lightgray', linestyle='--')
+    plt.axvline(x=drop['end'], color='lightgray', linestyle='--')
 
 plt.xlabel("Simulation time (s)", fontsize=12)
 plt.ylabel("$N'(x,t) = N(x,t) - q_0 \\times t$", fontsize=12)
@@ -1,97 +1,75 @@
-import traci
+import os
+import sys
 import matplotlib.pyplot as plt
 
+# Path setup (shared helpers live in with_traffic_light/dqn_model)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "with_traffic_light"))
+from dqn_model.detector_registry import load_layout
+from dqn_model.result_cache import baseline_series
+from dqn_model.capacity_drop import Q0, from_series, oblique_curves, travel_time_shifts, align, detect_capacity_drop
+
 # --- CONFIGURATION ---
 SUMO_CMD = ["sumo", "-c", "simulation.sumocfg"]
 
-# Detector IDs (Indices mapped to your 4-lane/5-lane sections)
-DETECTORS_1 = ["det_loc1_0", "det_loc1_1", "det_loc1_2", "det_loc1_3", "det_loc1_4"] # +920m
-DETECTORS_2 = ["det_loc2_0", "det_loc2_1", "det_loc2_2", "det_loc2_3"]               # +1225m
-DETECTORS_3 = ["det_loc3_0", "det_loc3_1", "det_loc3_2", "det_loc3_3"]               # +1475m
+# Detector groups from the detector registry (+920m, +1225m, +1475m)
+LAYOUT = load_layout(SUMO_CMD[2])
 
 # Paper Constants
-Q0_HOUR = 8160.0           # Background flow (veh/h) [cite: 264]
-STEP_LENGTH = 0.5          # Your SUMO step length
-Q0_SEC = Q0_HOUR / 3600.0  # Background flow per second (~2.267 veh/s)
+STEP_LENGTH = 1            # step-length in simulation.sumocfg (the analysis reads the actual times)
 SIM_TOTAL_TIME = 2400      # Duration matching Figure 6 [cite: 346]
 
 def run_replication():
-    traci.start(SUMO_CMD)
-    
-    # Cumulative vehicle counters (N)
-    cum_1 = 0; cum_2 = 0; cum_3 = 0
-    
-    # Data storage for N'(x,t) sampled every 1 second
-    n_prime_1 = []; n_prime_2 = []; n_prime_3 = []
-    time_points = []
-    
-    step = 0
     max_steps = int(SIM_TOTAL_TIME / STEP_LENGTH)
-    
-    while step < max_steps:
-        traci.simulationStep()
-        
-        # 1. Update cumulative vehicle counts N(x,t)
-        # sum() aggregates vehicles passing the detectors in this 0.5s step
-        cum_1 += sum(traci.inductionloop.getLastStepVehicleNumber(d) for d in DETECTORS_1)
-        cum_2 += sum(traci.inductionloop.getLastStepVehicleNumber(d) for d in DETECTORS_2)
-        cum_3 += sum(traci.inductionloop.getLastStepVehicleNumber(d) for d in DETECTORS_3)
-        
-        # 2. Sample data every 1 second (every 2 steps) to match paper resolution
-        if step % 2 == 0:
-            current_time = step * STEP_LENGTH
-            
-            # Formula: N'(x,t) = N(x,t) - q0 * t [cite: 79]
-            np1 = cum_1 - (Q0_SEC * current_time)
-            np2 = cum_2 - (Q0_SEC * current_time)
-            np3 = cum_3 - (Q0_SEC * current_time)
-            
-            n_prime_1.append(np1)
-            n_prime_2.append(np2)
-            n_prime_3.append(np3)
-            time_points.append(current_time)
-            
-        step += 1
-
-    traci.close()
-    plot_figure_6(time_points, n_prime_1, n_prime_2, n_prime_3)
-
-def plot_figure_6(t, data1, data2, data3):
+    # No-control run, simulated once and then read from the baseline cache
+    series = baseline_series(SUMO_CMD, max_steps)
+    times, counts, occupancy = from_series(series, LAYOUT)
+    delta_t = times[1] - times[0]
+
+    # Formula: N'(x,t) = N(x,t) - q0 * t [cite: 79], background flow q0 = 8160 veh/h [cite: 264]
+    curves = oblique_curves(times, counts, Q0)
+
+    # Travel time shifts align downstream observations back to the upstream bottleneck entry
+    # (estimated by cross-correlation; the paper's network gives 16 s and 25 s)
+    shifts = travel_time_shifts(counts, delta_t)
+    t, aligned = align(times, curves, shifts, delta_t)
+    print(f"Travel time shifts: +1225 m {shifts[1]:.0f}s, +1475 m {shifts[2]:.0f}s")
+
+    drop = detect_capacity_drop(times, counts, occupancy, shifts=shifts)
+    if drop is not None:
+        print(f"Capacity drop: onset {drop['onset']:.0f}s, {drop['capacity']:.0f} -> {drop['discharge']:.0f} veh/h "
+              f"({100 * drop['drop']:.1f}%)")
+
+    plot_figure_6(t, aligned, drop)
+
+def plot_figure_6(t, curves, drop):
     plt.figure(figsize=(8, 6))
-    
-    # Travel time shifts from paper (seconds) [cite: 264]
-    # These align downstream observations back to the upstream bottleneck entry
-    shift_1225 = 16 
-    shift_1475 = 25 
-    
+
     # --- PLOTTING WITH PAPER STYLING ---
     # Line 1 (+920m): Upstream reference (Red)
-    plt.plot(t[:-shift_1475], data1[:-shift_1475], 
-             label='+920 m', color='firebrick', linewidth=1.2)
-    
-    # Line 2 (+1225m): Orange, shifted 16s left
-    plt.plot(t[:-shift_1475], data2[shift_1225 : -(shift_1475 - shift_1225)], 
-             label='+1225 m', color='orange', linewidth=1.2)
-
-    # Line 3 (+1475m): Blue, shifted 25s left, with 'x' markers 
-    plt.plot(t[:-shift_1475], data3[shift_1475:], 
-             label='+1475 m', color='steelblue', linewidth=1.0, 
+    plt.plot(t, curves[:, 0], label='+920 m', color='firebrick', linewidth=1.2)
+
+    # Line 2 (+1225m): Orange, shifted left by its travel time
+    plt.plot(t, curves[:, 1], label='+1225 m', color='orange', linewidth=1.2)
+
+    # Line 3 (+1475m): Blue, shifted left by its travel time, with 'x' markers
+    plt.plot(t, curves[:, 2], label='+1475 m', color='steelblue', linewidth=1.0,
              marker='x', markevery=60, markersize=4)
-    
+
     # Matching y-axis label and scale from Figure 6
     plt.ylabel("$N'(x, t) = N(x, t) - q_0 \\times t$", fontsize=12)
     plt.xlabel("Simulation time (s)", fontsize=12)
-    
+
     # Formatting
     plt.legend(loc='lower left', frameon=False, fontsize=10)
     plt.grid(True, linestyle='-', alpha=0.2)
-    
-    # Congestion onset markers mentioned in Section 4.1 [cite: 265-267]
-    plt.axvline(x=600, color='lightgray', linestyle='--', linewidth=0.8)
-    plt.axvline(x=950, color='lightgray', linestyle='--', linewidth=0.8)
-    
+
+    # Detected congestion onset / end (Section 4.1 of the paper: ~600 s and ~950 s) [cite: 265-267]
+    if drop is not None:
+        plt.axvline(x=drop['onset'], color='lightgray', linestyle='--', linewidth=0.8)
+        plt.axvline(x=drop['end'], color='lightgray', linestyle='--', linewidth=0.8)
+
     plt.tight_layout()
     plt.show()
 
 if __name__ == "__main__":
-    run_replication()
\ No newline at end of file
+    run_replication()
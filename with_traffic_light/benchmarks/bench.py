@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import numpy as np
+import torch
+
+# Path setup
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn_model.sim_backend import set_backend
+from dqn_model.replay_traci import ReplayConnection, REPLAY_FILE, save_recording
+from dqn_model.sensors import SensorReader
+from dqn_model.detector_registry import load_layout
+from dqn_model.aggregator import DetectorAggregator
+from dqn_model.env import SUMO_PATH, STATE_SIZE, ACTION_SIZE, CONTROL_INTERVAL, MAX_STEPS, averages_from, build_state
+from dqn_model.dqn_agent import Agent, DQN, MultiRampPolicy
+
+# Benchmark suite for the Python side of the control loop.
+# Runs on the "replay" backend (values recorded from one real SUMO run, replayed without SUMO),
+# so it works headless on any Linux box. Every benchmark uses fixed seeds, is repeated and
+# reports its best repeat. Results can be stored as a baseline and later runs compared to it.
+#
+# Usage (from with_traffic_light/):
+#   python benchmarks/bench.py                    # run and compare with benchmarks/baselines.json
+#   python benchmarks/bench.py --save-baseline    # store this machine's results as the baseline
+#   python benchmarks/bench.py --record           # re-record the replay file (needs SUMO)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+SEED = 0
+REPLAY_CALLS = 500
+STATE_BUILDS = 5000
+MULTI_RAMPS = 16
+DECISIONS = 2000
+
+
+def _seed_everything():
+    random.seed(SEED)
+    np.random.seed(SEED)
+    torch.manual_seed(SEED)
+
+
+def bench_run_simulation():
+    # A full training episode: env + act + remember + replay
+    from dqn_model.run_rl import run_simulation
+    _seed_everything()
+    agent = Agent(STATE_SIZE, ACTION_SIZE)
+    agent.epsilon = 0.5
+    start = time.perf_counter()
+    run_simulation(agent, progress=False)
+    elapsed = time.perf_counter() - start
+    return {"steps/s": MAX_STEPS / elapsed, "transitions/s": (MAX_STEPS // CONTROL_INTERVAL) / elapsed}
+
+
+def bench_detector_polling():
+    # Subscription read + in-place interval aggregation, once per simulation step
+    layout = load_layout(SUMO_PATH)
+    conn = ReplayConnection()
+    sensors = SensorReader(conn, layout)
+    aggregator = DetectorAggregator(layout.group_sizes)
+    start = time.perf_counter()
+    for step in range(MAX_STEPS):
+        conn.simulationStep()
+        sensors.update()
+        aggregator.update_from(sensors)
+        if step % CONTROL_INTERVAL == 0:
+            aggregator.emit()
+    elapsed = time.perf_counter() - start
+    return {"steps/s": MAX_STEPS / elapsed}
+
+
+def bench_replay():
+    # Agent.replay on a full-enough buffer of random transitions
+    _seed_everything()
+    agent = Agent(STATE_SIZE, ACTION_SIZE)
+    for _ in range(10 * agent.batch_size):
+        agent.remember(np.random.rand(STATE_SIZE), random.randrange(ACTION_SIZE), np.random.rand(),
+                       np.random.rand(STATE_SIZE), False)
+    start = time.perf_counter()
+    for _ in range(REPLAY_CALLS):
+        agent.replay()
+    elapsed = time.perf_counter() - start
+    return {"calls/s": REPLAY_CALLS / elapsed, "transitions/s": REPLAY_CALLS * agent.batch_size / elapsed}
+
+
+def bench_state_building():
+    # Interval means -> averages dict -> normalised state vector
+    layout = load_layout(SUMO_PATH)
+    aggregator = DetectorAggregator(layout.group_sizes)
+    conn = ReplayConnection()
+    sensors = SensorReader(conn, layout)
+    aggregator.update_from(sensors)
+    start = time.perf_counter()
+    for _ in range(STATE_BUILDS):
+        build_state(averages_from(aggregator.emit()))
+    elapsed = time.perf_counter() - start
+    return {"states/s": STATE_BUILDS / elapsed}
+
+
+def bench_multi_ramp_inference():
+    # One epsilon-greedy decision for MULTI_RAMPS ramps, each with its own network, per call
+    _seed_everything()
+    policy = MultiRampPolicy([DQN(STATE_SIZE, ACTION_SIZE) for _ in range(MULTI_RAMPS)],
+                             epsilon=np.linspace(0.0, 0.5, MULTI_RAMPS))
+    states = np.random.rand(MULTI_RAMPS, STATE_SIZE).astype(np.float32)
+    start = time.perf_counter()
+    for _ in range(DECISIONS):
+        policy.act(states)
+    elapsed = time.perf_counter() - start
+    return {"decisions/s": DECISIONS / elapsed, "ramp-decisions/s": DECISIONS * MULTI_RAMPS / elapsed}
+
+
+BENCHMARKS = {
+    "run_simulation": bench_run_simulation,
+    "detector_polling": bench_detector_polling,
+    "replay": bench_replay,
+    "state_building": bench_state_building,
+    "multi_ramp_inference": bench_multi_ramp_inference,
+}
+
+
+def run_benchmarks(names, repeats):
+    results = {}
+    for name in names:
+        runs = [BENCHMARKS[name]() for _ in range(repeats)]
+        # Best repeat per metric (all metrics are rates, higher is better)
+        results[name] = {metric: max(r[metric] for r in runs) for metric in runs[0]}
+    return results
+
+
+def compare(results, baselines, tolerance):
+    """Prints every metric next to its baseline. Returns the names of the regressed metrics."""
+    regressions = []
+    print(f"{'benchmark':22s} {'metric':16s} {'result':>12s} {'baseline':>12s} {'ratio':>7s}")
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baselines.get(name, {}).get(metric)
+            if base is None:
+                print(f"{name:22s} {metric:16s} {value:12.1f} {'-':>12s} {'-':>7s}")
+                continue
+            ratio = value / base
+            flag = ""
+            if ratio < 1.0 - tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{name}.{metric}")
+            print(f"{name:22s} {metric:16s} {value:12.1f} {base:12.1f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def record(steps):
+    # One real no-control run (light held green), replayed by the "replay" backend
+    from dqn_model.result_cache import simulate_baseline
+    layout = load_layout(SUMO_PATH)
+    series = simulate_baseline(["sumo", "-c", SUMO_PATH], steps, hold_green=True, layout=layout)
+    save_recording(REPLAY_FILE, series, layout)
+    print(f"Recorded {steps} steps to {REPLAY_FILE}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the control loop on recorded SUMO data")
+    parser.add_argument("benchmarks", nargs="*",
+                        help=f"Benchmarks to run, any of {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative slowdown against the baseline reported as a regression")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 on a regression")
+    parser.add_argument("--record", action="store_true", help="Re-record the replay file from a real SUMO run")
+    parser.add_argument("--record-steps", type=int, default=MAX_STEPS + 1)
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    if args.record:
+        record(args.record_steps)
+        sys.exit(0)
+
+    set_backend("replay")
+    torch.set_num_threads(1)
+    results = run_benchmarks(args.benchmarks or list(BENCHMARKS), args.repeats)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            baselines = json.load(fh)["results"]
+    regressions = compare(results, baselines, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as fh:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "torch": torch.__version__, "results": results}, fh, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif args.check and regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,93 @@
+import numpy as np
+
+# Streaming interval aggregation.
+# Instead of appending every reading to Python lists and calling np.mean at the end of each
+# interval, running sums and sample counts are updated in place each step. Several windows
+# (e.g. a 15 s and a 30 s interval) are fed from the same single pass.
+# The aggregator does not know the window lengths: the caller decides when an interval ends and
+# calls emit(window) then (RampMeteringEnv every control_interval simulation steps, counting the
+# readings taken at reset into the first interval).
+
+
+class IntervalAggregator:
+    def __init__(self, num_channels, num_windows=1):
+        self.num_windows = num_windows
+        self.sums = np.zeros((num_windows, num_channels))
+        self.counts = np.zeros((num_windows, num_channels))
+        self.means = np.zeros((num_windows, num_channels))
+
+    def add(self, sums, counts):
+        # Same sample goes into every window (broadcast over the window axis)
+        self.sums += sums
+        self.counts += counts
+
+    def emit(self, window=0):
+        """Writes the interval means of `window` into a preallocated row, resets it and returns it.
+
+        Channels without a single valid sample in the interval report 0.0.
+        """
+        means = self.means[window]
+        means.fill(0.0)
+        np.divide(self.sums[window], self.counts[window], out=means, where=self.counts[window] > 0)
+        self.sums[window].fill(0.0)
+        self.counts[window].fill(0.0)
+        return means
+
+
+# Detector-group front end: turns the raw per-detector readings of SensorReader into
+# per-group channels (speed, occupancy, flow) plus the ramp queue.
+# Speeds equal to SUMO's -1 "no vehicle" sentinel are never counted: the interval speed is the
+# mean over all detector readings that actually saw a vehicle (0.0 if none did).
+class DetectorAggregator:
+    def __init__(self, group_sizes, num_windows=1):
+        self.num_groups = len(group_sizes)
+        num_detectors = sum(group_sizes)
+
+        # Group membership matrix, so per-group sums are one matrix-vector product
+        self.membership = np.zeros((self.num_groups, num_detectors))
+        start = 0
+        for g, size in enumerate(group_sizes):
+            self.membership[g, start:start + size] = 1.0
+            start += size
+        self.lane_counts = np.array(group_sizes, dtype=float)
+
+        G = self.num_groups
+        self.speed = slice(0, G)
+        self.occ = slice(G, 2 * G)
+        self.flow = slice(2 * G, 3 * G)
+        self.queue = 3 * G
+
+        self.aggregator = IntervalAggregator(3 * G + 1, num_windows)
+        self.step_sums = np.zeros(3 * G + 1)
+        self.step_counts = np.zeros(3 * G + 1)
+        self.valid = np.zeros(num_detectors)
+        self.masked_speeds = np.zeros(num_detectors)
+
+        # Flow is reported in veh/h per lane: mean vehicles per lane and step * 3600
+        self.scale = np.ones(3 * G + 1)
+        self.scale[self.flow] = 3600.0
+        self.output = np.zeros((num_windows, 3 * G + 1))
+
+    def update(self, speeds, occupancies, counts, halting):
+        np.not_equal(speeds, -1, out=self.valid, casting='unsafe')
+        np.multiply(speeds, self.valid, out=self.masked_speeds)
+
+        np.dot(self.membership, self.masked_speeds, out=self.step_sums[self.speed])
+        np.dot(self.membership, self.valid, out=self.step_counts[self.speed])
+        np.dot(self.membership, occupancies, out=self.step_sums[self.occ])
+        self.step_counts[self.occ] = self.lane_counts
+        np.dot(self.membership, counts, out=self.step_sums[self.flow])
+        self.step_counts[self.flow] = self.lane_counts
+        self.step_sums[self.queue] = halting.sum()
+        self.step_counts[self.queue] = len(halting)
+
+        self.aggregator.add(self.step_sums, self.step_counts)
+
+    def update_from(self, sensors):
+        self.update(sensors.speeds, sensors.occupancies, sensors.counts, sensors.halting)
+
+    def emit(self, window=0):
+        """Returns the interval means as [speed_g..., occ_g..., flow_g..., queue] (preallocated, reused)."""
+        out = self.output[window]
+        np.multiply(self.aggregator.emit(window), self.scale, out=out)
+        return out
@@ -0,0 +1,101 @@
+import os
+import json
+import numpy as np
+import multiprocessing as mp
+
+# Reward calibration sweep.
+# ALPHA / BETA of the TTS reward are the maximum and the mean TTS per control interval of an
+# uncontrolled run (paper: "replace a and B with the maximum TTS and average TTS"). They depend on
+# the demand and on SUMO's driver randomness, so the sweep runs the uncontrolled simulation over a
+# grid of seeds x demand scalings in a process pool and stores the mean (with a 95% confidence
+# interval) per demand scaling in a calibration table next to the .sumocfg. RampMeteringEnv
+# picks the matching entry up automatically.
+
+CALIBRATION_FILE = "calibration.json"
+
+
+def calibration_path(sumo_path):
+    return os.path.join(os.path.dirname(os.path.abspath(sumo_path)), CALIBRATION_FILE)
+
+
+def _entry_key(demand_scale, control_interval, max_steps):
+    return f"scale={demand_scale:g},interval={control_interval},steps={max_steps}"
+
+
+def load_calibration(sumo_path, demand_scale, control_interval, max_steps):
+    """Returns (alpha, beta) from the calibration table, or None if this setting was never calibrated."""
+    path = calibration_path(sumo_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        table = json.load(fh)
+    entry = table.get(_entry_key(demand_scale, control_interval, max_steps))
+    if entry is None:
+        return None
+    return entry["alpha"], entry["beta"]
+
+
+def _calibration_run(job):
+    # Imported here so each pool process sets up its own simulation backend
+    from dqn_model.result_cache import baseline_series, interval_tts
+
+    sumo_path, seed, demand_scale, control_interval, max_steps = job
+    sumo_cmd = ["sumo", "-c", sumo_path]
+    if demand_scale != 1.0:
+        sumo_cmd += ["--scale", str(demand_scale)]
+
+    # No control: the light stays green for the whole run (same TTS accounting as RampMeteringEnv).
+    # Runs that were simulated before come straight from the baseline cache.
+    series = baseline_series(sumo_cmd, max_steps, seed=seed, hold_green=True)
+    tts_history = interval_tts(series, control_interval)
+
+    return seed, demand_scale, float(np.max(tts_history)), float(np.mean(tts_history))
+
+
+def mean_ci(values):
+    # Mean and 95% confidence interval (normal approximation)
+    values = np.asarray(values, dtype=float)
+    mean = float(values.mean())
+    if len(values) < 2:
+        return mean, [mean, mean]
+    half = 1.96 * values.std(ddof=1) / np.sqrt(len(values))
+    return mean, [mean - half, mean + half]
+
+
+def run_sweep(sumo_path, seeds, demand_scales, control_interval, max_steps, workers=None):
+    """Calibrates every (seed, demand scaling) pair in parallel and updates the calibration table.
+
+    Returns the table entries that were written.
+    """
+    jobs = [(sumo_path, seed, scale, control_interval, max_steps)
+            for scale in demand_scales for seed in seeds]
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(workers) as pool:
+        results = pool.map(_calibration_run, jobs)
+
+    path = calibration_path(sumo_path)
+    table = {}
+    if os.path.exists(path):
+        with open(path) as fh:
+            table = json.load(fh)
+
+    written = {}
+    for scale in demand_scales:
+        runs = [r for r in results if r[1] == scale]
+        alpha, alpha_ci = mean_ci([r[2] for r in runs])
+        beta, beta_ci = mean_ci([r[3] for r in runs])
+        key = _entry_key(scale, control_interval, max_steps)
+        written[key] = table[key] = {
+            "alpha": alpha, "alpha_ci": alpha_ci,
+            "beta": beta, "beta_ci": beta_ci,
+            "seeds": [r[0] for r in runs],
+            "max_tts": [r[2] for r in runs],
+            "mean_tts": [r[3] for r in runs],
+        }
+
+    # Atomic replace so a training run never reads a half-written table
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(table, fh, indent=2)
+    os.replace(tmp_path, path)
+    return written
@@ -0,0 +1,148 @@
+import numpy as np
+
+from dqn_model.result_cache import group_counts
+
+# Capacity-drop analysis on per-step detector counts.
+# Works on (steps x locations) arrays, whatever run they come from (a live run, a cached baseline
+# series or a recorded trace, see from_series / from_trace), with locations in upstream ->
+# downstream order:
+#   - oblique cumulative curves N'(x,t) = N(x,t) - q0*t for all locations at once
+#   - travel-time shifts between locations, estimated by cross-correlating their flows
+#   - capacity-drop onset (sustained high occupancy at the bottleneck) and magnitude
+#     (pre-queue capacity vs. queue discharge rate downstream)
+# Everything is vectorised, so analysing hundreds of runs is a batch job.
+
+Q0 = 8160.0 / 3600.0        # Background flow from the paper (veh/s)
+CRITICAL_OCC = 13.0         # Bottleneck occupancy (%) above which it counts as congested
+SMOOTH_S = 60.0             # Moving-average window for flows / occupancies (s)
+MIN_CONGESTION_S = 120.0    # Shorter congested spells are ignored (s)
+LOOKBACK_S = 600.0          # Pre-queue capacity is the highest flow this long before onset (s)
+MAX_SHIFT_S = 120.0
+
+
+def from_series(series, layout):
+    """(times, counts, occupancy) per location of a result_cache baseline series."""
+    starts = [s.start for s in layout.group_slices]
+    sizes = np.array(layout.group_sizes)
+    occupancy = np.add.reduceat(series["occupancies"][1:], starts, axis=1) / sizes
+    return series["time"], group_counts(series, layout), occupancy
+
+
+def from_trace(reader, records, delta_t=1.0):
+    """(times, counts, occupancy) per location of one trace episode (trace.TraceReader.episodes())."""
+    rows = records[1:]
+    lanes = reader.membership.sum(axis=1)
+    times = rows["step"] * delta_t
+    return times, rows["counts"] @ reader.membership.T, (rows["occupancies"] @ reader.membership.T) / lanes
+
+
+def oblique_curves(times, counts, q0=Q0, lanes=None):
+    """N'(x,t) = N(x,t) - q0*t for every location (columns of `counts`).
+
+    With `lanes` (one count per location) N is taken per lane; q0 must then be per lane too.
+    """
+    cumulative = np.cumsum(counts, axis=0, dtype=np.float64)
+    if lanes is not None:
+        cumulative = cumulative / np.asarray(lanes, dtype=np.float64)
+    return cumulative - q0 * np.asarray(times, dtype=np.float64)[:, None]
+
+
+def moving_average(values, window):
+    # Centred moving average over `window` rows (along axis 0), shrinking at the edges
+    values = np.asarray(values, dtype=np.float64)
+    padded = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+    n = len(values)
+    lo = np.clip(np.arange(n) - window // 2, 0, n)
+    hi = np.clip(np.arange(n) + (window - window // 2), 0, n)
+    return (padded[hi] - padded[lo]) / (hi - lo).reshape((-1,) + (1,) * (values.ndim - 1))
+
+
+def flow_rates(counts, delta_t, window_s=SMOOTH_S):
+    """Smoothed flow (veh/h) of every location."""
+    return moving_average(counts, max(1, int(round(window_s / delta_t)))) * 3600.0 / delta_t
+
+
+def travel_time_shifts(counts, delta_t, max_shift_s=MAX_SHIFT_S, reference=0):
+    """Travel time (s) from the reference location to every location.
+
+    The lag maximising the cross-correlation of the two (mean-removed) count series, searched
+    in [0, max_shift_s]; one FFT per location.
+    """
+    x = np.asarray(counts, dtype=np.float64)
+    x = x - x.mean(axis=0)
+    n = len(x)
+    spectra = np.fft.rfft(x, 2 * n, axis=0)
+    correlation = np.fft.irfft(np.conj(spectra[:, [reference]]) * spectra, 2 * n, axis=0)
+    max_lag = min(int(max_shift_s / delta_t), n - 1)
+    return correlation[:max_lag + 1].argmax(axis=0) * delta_t
+
+
+def align(times, curves, shifts, delta_t):
+    """Shifts every column left by its travel time, so all curves refer to the reference location's clock."""
+    steps = np.round(np.asarray(shifts) / delta_t).astype(int)
+    length = len(curves) - steps.max()
+    index = np.arange(length)[:, None] + steps[None, :]
+    return np.asarray(times)[:length], np.take_along_axis(np.asarray(curves), index, axis=0)
+
+
+def congested_spells(occupancy, delta_t, threshold=CRITICAL_OCC, window_s=SMOOTH_S, min_s=MIN_CONGESTION_S):
+    """[(start, end)] row ranges where the smoothed occupancy stays above `threshold` for at least `min_s`."""
+    smoothed = moving_average(occupancy, max(1, int(round(window_s / delta_t))))
+    above = np.r_[False, smoothed > threshold, False]
+    edges = np.flatnonzero(np.diff(above.astype(np.int8)))
+    spells = []
+    for s, e in edges.reshape(-1, 2):
+        # Brief dips below the threshold do not end a spell
+        if spells and (s - spells[-1][1]) * delta_t < min_s:
+            spells[-1][1] = e
+        else:
+            spells.append([s, e])
+    return [(int(s), int(e)) for s, e in spells if (e - s) * delta_t >= min_s]
+
+
+def detect_capacity_drop(times, counts, occupancy, bottleneck=0, downstream=-1, shifts=None,
+                         threshold=CRITICAL_OCC, window_s=SMOOTH_S, lookback_s=LOOKBACK_S):
+    """Onset and magnitude of the first capacity drop, or None if the bottleneck never congests.
+
+    Onset is the start of the first sustained congested spell at the bottleneck location. The
+    pre-queue capacity is the highest smoothed downstream flow in the `lookback_s` before it,
+    the discharge rate the mean downstream flow during the spell (both shifted by the travel
+    time to the downstream location).
+    """
+    times = np.asarray(times)
+    delta_t = float(times[1] - times[0])
+    spells = congested_spells(np.asarray(occupancy)[:, bottleneck], delta_t, threshold, window_s)
+    if not spells:
+        return None
+    start, end = spells[0]
+
+    counts = np.asarray(counts)
+    if shifts is None:
+        shifts = travel_time_shifts(counts, delta_t, reference=bottleneck)
+    lag = int(round((shifts[downstream] - shifts[bottleneck]) / delta_t))
+    flow = flow_rates(counts[:, downstream], delta_t, window_s)
+
+    before = flow[max(0, start + lag - int(lookback_s / delta_t)):start + lag]
+    during = flow[start + lag:min(end + lag, len(flow))]
+    if not len(before) or not len(during):
+        return None
+    capacity = float(before.max())
+    discharge = float(during.mean())
+    return {
+        "onset": float(times[start]),
+        "end": float(times[min(end, len(times) - 1)]),
+        "capacity": capacity,
+        "discharge": discharge,
+        "drop": (capacity - discharge) / capacity if capacity > 0 else 0.0,
+    }
+
+
+def analyze(times, counts, occupancy, **kwargs):
+    """Travel-time shifts + capacity drop of one run, as a flat dict (one row of a batch table)."""
+    delta_t = float(times[1] - times[0])
+    shifts = travel_time_shifts(counts, delta_t)
+    result = {f"shift_{i}": float(s) for i, s in enumerate(shifts)}
+    drop = detect_capacity_drop(times, counts, occupancy, shifts=shifts, **kwargs)
+    result.update(drop if drop is not None else dict(onset=np.nan, end=np.nan, capacity=np.nan,
+                                                     discharge=np.nan, drop=np.nan))
+    return result
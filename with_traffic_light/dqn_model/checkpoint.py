@@ -0,0 +1,104 @@
+import os
+import random
+import shutil
+import numpy as np
+import torch
+
+# Full training-state checkpoints.
+# Each checkpoint is a directory holding:
+#   state.pt   - network (+ target network) + optimizer state dicts, epsilon, RNG states and the training progress
+#   *.npy      - the replay buffer, one raw array per field (see ReplayBuffer.save)
+# It is written to a temporary directory first and renamed into place, and the LATEST file is
+# replaced atomically afterwards, so a crash mid-write never leaves a half-written checkpoint behind.
+
+LATEST = "LATEST"
+KEEP_LAST = 2
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def save_checkpoint(agent, directory, episode, training_state):
+    """Writes the complete agent state after `episode` into `directory`/ep_XXXX."""
+    os.makedirs(directory, exist_ok=True)
+    name = f"ep_{episode:04d}"
+    final_path = os.path.join(directory, name)
+    tmp_path = final_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    buffer_meta = agent.memory.save(tmp_path)
+    state = {
+        'model': agent.model.state_dict(),
+        'target_model': agent.target_model.state_dict() if agent.target_model is not None else None,
+        'learn_steps': agent.learn_steps,
+        'optimizer': agent.optimizer.state_dict(),
+        'epsilon': agent.epsilon,
+        'buffer': buffer_meta,
+        'rng': {
+            'python': random.getstate(),
+            'numpy': np.random.get_state(),
+            'torch': torch.get_rng_state(),
+        },
+        'episode': episode,
+        'training': training_state,
+    }
+    torch.save(state, os.path.join(tmp_path, "state.pt"))
+    for f in os.listdir(tmp_path):
+        with open(os.path.join(tmp_path, f), "rb+") as fh:
+            os.fsync(fh.fileno())
+
+    shutil.rmtree(final_path, ignore_errors=True)
+    os.rename(tmp_path, final_path)
+
+    # Point LATEST at the new checkpoint (atomic replace)
+    latest_tmp = os.path.join(directory, LATEST + ".tmp")
+    with open(latest_tmp, "w") as fh:
+        fh.write(name)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(latest_tmp, os.path.join(directory, LATEST))
+    _fsync_dir(directory)
+
+    # Drop older checkpoints
+    old = sorted(d for d in os.listdir(directory) if d.startswith("ep_") and not d.endswith(".tmp"))
+    for d in old[:-KEEP_LAST]:
+        shutil.rmtree(os.path.join(directory, d), ignore_errors=True)
+
+    return final_path
+
+
+def load_checkpoint(agent, directory):
+    """Restores `agent` from the latest checkpoint in `directory`.
+
+    Returns (episode, training_state), or None if there is no checkpoint yet.
+    """
+    latest = os.path.join(directory, LATEST)
+    if not os.path.exists(latest):
+        return None
+    with open(latest) as fh:
+        path = os.path.join(directory, fh.read().strip())
+
+    state = torch.load(os.path.join(path, "state.pt"), weights_only=False)
+    agent.model.load_state_dict(state['model'])
+    agent.optimizer.load_state_dict(state['optimizer'])
+    agent.learn_steps = state.get('learn_steps', 0)
+    if agent.target_model is not None:
+        # Checkpoints written without a target network start it from the online weights
+        if state.get('target_model') is not None:
+            agent.target_model.load_state_dict(state['target_model'])
+        else:
+            agent.update_target()
+    agent.epsilon = state['epsilon']
+    agent.memory.load(path, state['buffer'])
+
+    random.setstate(state['rng']['python'])
+    np.random.set_state(state['rng']['numpy'])
+    torch.set_rng_state(state['rng']['torch'])
+
+    return state['episode'], state['training']
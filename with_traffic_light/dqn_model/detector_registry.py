@@ -0,0 +1,109 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from functools import lru_cache
+
+# Detector / ramp registry.
+# The layout is read from the SUMO files instead of being hard-coded in every script:
+#   - induction loops come from the additional files listed in the .sumocfg and are grouped by
+#     (edge, position), i.e. one group per measurement cross-section, in file order
+#   - metered ramps come from the network: the lanes feeding each traffic light's controlled
+#     links (or, in a network without traffic lights, the lanes of the motorway_link edges)
+# Parsing happens once per process; load_layout() is cached.
+
+SUMO_PATH = os.path.join("sumo_network", "data", "simulation.sumocfg")
+
+DetectorGroup = namedtuple("DetectorGroup", ["name", "edge", "pos", "detector_ids", "lanes"])
+Ramp = namedtuple("Ramp", ["tl_id", "lanes"])
+
+
+class DetectorLayout:
+    def __init__(self, groups, ramps):
+        self.groups = groups
+        self.ramps = ramps
+
+        # Flat detector order used by SensorReader / DetectorAggregator arrays
+        self.detector_ids = [d for g in groups for d in g.detector_ids]
+        self.group_sizes = [len(g.detector_ids) for g in groups]
+        self.group_slices = []
+        start = 0
+        for size in self.group_sizes:
+            self.group_slices.append(slice(start, start + size))
+            start += size
+
+        self.group_index = {g.name: i for i, g in enumerate(groups)}
+        self.ramp_lanes = [lane for r in ramps for lane in r.lanes]
+
+    def group(self, name):
+        return self.groups[self.group_index[name]]
+
+
+def _split_files(value):
+    return [f for f in re.split(r"[,\s]+", value) if f]
+
+
+def _read_config(sumocfg_path):
+    # Returns the network file and additional files listed in a .sumocfg (resolved against its directory)
+    cfg_dir = os.path.dirname(os.path.abspath(sumocfg_path))
+    root = ET.parse(sumocfg_path).getroot()
+    net_file, additional_files = None, []
+    for node in root.iter():
+        if node.tag == "net-file":
+            net_file = os.path.join(cfg_dir, node.get("value"))
+        elif node.tag == "additional-files":
+            additional_files += [os.path.join(cfg_dir, f) for f in _split_files(node.get("value"))]
+    return net_file, additional_files
+
+
+def parse_detectors(additional_files):
+    groups = {}
+    for path in additional_files:
+        for node in ET.parse(path).getroot().iter("inductionLoop"):
+            lane = node.get("lane")
+            edge = lane.rsplit("_", 1)[0]
+            key = (edge, float(node.get("pos")))
+            groups.setdefault(key, []).append((node.get("id"), lane))
+
+    layout = []
+    for (edge, pos), members in groups.items():
+        # Detectors ordered by lane index, group named after the shared ID prefix (det_loc1_0 -> det_loc1)
+        members.sort(key=lambda m: int(m[1].rsplit("_", 1)[1]))
+        ids = [m[0] for m in members]
+        name = os.path.commonprefix(ids).rstrip("_") or ids[0]
+        layout.append(DetectorGroup(name, edge, pos, ids, [m[1] for m in members]))
+    return layout
+
+
+def parse_ramps(net_file):
+    root = ET.parse(net_file).getroot()
+
+    tl_lanes = {}
+    for tl in root.iter("tlLogic"):
+        tl_lanes[tl.get("id")] = []
+    for conn in root.iter("connection"):
+        tl_id = conn.get("tl")
+        if tl_id is not None:
+            lane = f"{conn.get('from')}_{conn.get('fromLane')}"
+            if lane not in tl_lanes[tl_id]:
+                tl_lanes[tl_id].append(lane)
+    if tl_lanes:
+        return [Ramp(tl_id, lanes) for tl_id, lanes in tl_lanes.items()]
+
+    # Uncontrolled network: every on-ramp (motorway_link) edge counts as one ramp
+    ramps = []
+    for edge in root.iter("edge"):
+        if edge.get("type") == "highway.motorway_link":
+            ramps.append(Ramp(None, [lane.get("id") for lane in edge.iter("lane")]))
+    return ramps
+
+
+@lru_cache(maxsize=None)
+def _load_layout(sumocfg_path):
+    net_file, additional_files = _read_config(sumocfg_path)
+    return DetectorLayout(parse_detectors(additional_files), parse_ramps(net_file))
+
+
+def load_layout(sumocfg_path=SUMO_PATH):
+    """Returns the (cached) DetectorLayout of the simulation described by `sumocfg_path`."""
+    return _load_layout(os.path.abspath(sumocfg_path))
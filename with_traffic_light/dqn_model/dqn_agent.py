@@ -1,9 +1,9 @@
+import copy
 import torch
 import torch.nn as nn
 import torch.optim as optim
-import random
 import numpy as np
-from collections import deque
+from dqn_model.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
 
 # 1. The Neural Network
 class DQN(nn.Module):
@@ -19,9 +19,24 @@ class DQN(nn.Module):
         x = torch.relu(self.fc2(x))
         return self.fc3(x)
 
+def explore(actions, epsilon, action_size):
+    # Epsilon-greedy over a batch of greedy actions; epsilon is a scalar or one value per action
+    mask = np.random.rand(len(actions)) <= epsilon
+    actions[mask] = np.random.randint(action_size, size=mask.sum())
+    return actions
+
+
+def epsilon_greedy(model, states, epsilon, action_size):
+    # One forward pass for a batch of states, then explore(); shared by Agent and RolloutAgent
+    state_tensor = torch.as_tensor(np.asarray(states), dtype=torch.float32)
+    with torch.inference_mode():
+        actions = model(state_tensor).argmax(dim=1).numpy()
+    return explore(actions, epsilon, action_size)
+
 # 2. The Agent (The Brain)
 class Agent:
-    def __init__(self, state_size, action_size):
+    def __init__(self, state_size, action_size, memory_size=100000, prioritized=False,
+                 target_update=0, tau=None, double=False):
         self.state_size = state_size
         self.action_size = action_size
 
@@ -38,51 +53,170 @@ class Agent:
         self.optimizer = optim.Adam(self.model.parameters(), lr=self.learning_rate)
         self.criterion = nn.MSELoss()
 
-        # Memory (Experience Replay)
-        self.memory = deque(maxlen=2000)
+        # Target network for the bootstrap targets: hard copy every `target_update` gradient
+        # steps, or Polyak averaging with factor `tau` after every step (0 / None = no target net)
+        self.target_update = target_update
+        self.tau = tau
+        self.double = double  # Double DQN: online net picks the next action, target net values it
+        if double and not (target_update or tau):
+            # Without a target net the online net would both pick and value: plain DQN targets
+            raise ValueError("double=True needs a target network (target_update or tau)")
+        self.target_model = None
+        if target_update or tau:
+            self.target_model = copy.deepcopy(self.model)
+            self.target_model.requires_grad_(False)
+        self.learn_steps = 0
+
+        # Memory (Experience Replay, optionally prioritized by TD error)
+        self.prioritized = prioritized
+        if prioritized:
+            self.memory = PrioritizedReplayBuffer(memory_size, state_size)
+        else:
+            self.memory = ReplayBuffer(memory_size, state_size)
 
     def act(self, state):
-        # Exploration: Random Move
-        if np.random.rand() <= self.epsilon:
-            return random.randrange(self.action_size)
+        # Epsilon-greedy for a single state (a batch of one)
+        return int(self.act_batch([state])[0])
 
-        # Exploitation: Best Move
-        state_tensor = torch.FloatTensor(state).unsqueeze(0)
-        with torch.no_grad():
-            q_values = self.model(state_tensor)
-        return torch.argmax(q_values).item()
+    def act_batch(self, states, epsilon=None):
+        # One forward pass for a whole batch of states, epsilon-greedy per row
+        # (epsilon: the agent's by default, or one value per row)
+        return epsilon_greedy(self.model, states, self.epsilon if epsilon is None else epsilon, self.action_size)
 
-    def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+    def remember(self, state, action, reward, next_state, done, steps=1):
+        # steps > 1: the action was repeated for that many intervals and `reward` is their discounted sum
+        self.memory.push(state, action, reward, next_state, done, steps)
 
     def replay(self):
         # Train the model using a random batch from memory
         if len(self.memory) < self.batch_size:
             return
 
-        minibatch = random.sample(self.memory, self.batch_size)
-
-        for state, action, reward, next_state, done in minibatch:
-            state_tensor = torch.FloatTensor(state)
-            next_state_tensor = torch.FloatTensor(next_state)
-
-            # The Target: Reward + Best Guess for Future
-            target = reward
-            if not done:
-                target = reward + self.gamma * torch.max(self.model(next_state_tensor)).item()
-
-            # The Prediction: What the model currently thinks
-            target_f = self.model(state_tensor)
-            current_prediction = target_f.clone()
-            current_prediction[action] = target
+        if self.prioritized:
+            *batch, indices, weights = self.memory.sample(self.batch_size)
+            td_errors = self.learn(*batch, weights=weights)
+            self.memory.update_priorities(indices, td_errors.abs().numpy())
+        else:
+            self.learn(*self.memory.sample(self.batch_size))
+
+    def learn(self, state_tensor, action_tensor, reward_tensor, next_state_tensor, done_tensor, steps_tensor=None,
+              weights=None):
+        """One gradient step on a batch of transitions. Returns the (detached) TD errors."""
+        action_tensor = action_tensor.unsqueeze(1)
+
+        # The Prediction: Q-value of the action that was actually taken
+        # (with Double DQN the next states go through the online network in the same forward pass)
+        if self.double:
+            q_values = self.model(torch.cat([state_tensor, next_state_tensor]))
+            q_values, next_online = q_values[:len(state_tensor)], q_values[len(state_tensor):].detach()
+        else:
+            q_values = self.model(state_tensor)
+        prediction = q_values.gather(1, action_tensor).squeeze(1)
 
-            # Update weights
-            self.optimizer.zero_grad()
-            loss = self.criterion(target_f, current_prediction)
-            loss.backward()
-            self.optimizer.step()
+        # The Target: Reward + Best Guess for Future (masked out on terminal transitions)
+        with torch.no_grad():
+            if self.target_model is not None:
+                next_values = self.target_model(next_state_tensor)
+            elif self.double:
+                next_values = next_online
+            else:
+                next_values = self.model(next_state_tensor)
+            if self.double:
+                next_q = next_values.gather(1, next_online.argmax(dim=1, keepdim=True)).squeeze(1)
+            else:
+                next_q = next_values.max(dim=1).values
+        # (an action repeated for k intervals bootstraps k intervals later: discount gamma^k)
+        discount = self.gamma if steps_tensor is None else torch.pow(self.gamma, steps_tensor.to(torch.float32))
+        target = reward_tensor + discount * next_q * (1.0 - done_tensor)
+
+        # Update weights (one gradient step per replay call)
+        self.optimizer.zero_grad()
+        td_errors = prediction - target
+        if weights is not None:
+            # Importance-sampling weights correct the bias of non-uniform sampling
+            loss = (weights * td_errors.pow(2)).mean()
+        else:
+            loss = self.criterion(prediction, target)
+        loss.backward()
+        self.optimizer.step()
+
+        self.learn_steps += 1
+        if self.target_model is not None:
+            if self.tau:
+                self.soft_update()
+            elif self.learn_steps % self.target_update == 0:
+                self.update_target()
+
+        return td_errors.detach()
+
+    def update_target(self):
+        # Hard update: copy the online weights into the target network
+        if self.target_model is not None:
+            self.target_model.load_state_dict(self.model.state_dict())
+
+    def soft_update(self):
+        # Polyak update: target <- (1 - tau) * target + tau * online
+        with torch.no_grad():
+            for target, online in zip(self.target_model.parameters(), self.model.parameters()):
+                target.lerp_(online, self.tau)
 
     def decay_epsilon(self):
         # Create a specific function for this
         if self.epsilon > self.epsilon_min:
-            self.epsilon *= self.epsilon_decay
\ No newline at end of file
+            self.epsilon *= self.epsilon_decay
+
+# 3. Batched inference for many metered ramps
+class MultiRampPolicy:
+    """Greedy / epsilon-greedy actions for n ramps with one forward pass per decision.
+
+    `models` is either one DQN shared by all ramps, or a list with one DQN per ramp. Per-ramp
+    networks are stacked into batched weight tensors, so every ramp is evaluated by its own
+    network in the same pass (row i of the states belongs to ramp i). Call sync() after the
+    underlying networks were trained.
+    """
+
+    def __init__(self, models, epsilon=0.0):
+        self.models = models if isinstance(models, (list, tuple)) else [models]
+        self.shared = len(self.models) == 1
+        self.num_ramps = None if self.shared else len(self.models)
+        self.action_size = self.models[0].fc3.out_features
+        self.epsilon = epsilon  # Scalar or one value per ramp
+        self.sync()
+
+    def sync(self):
+        if self.shared:
+            return
+        # (ramps, in, out) weights and (ramps, 1, out) biases of each layer
+        with torch.no_grad():
+            self.layers = [
+                (torch.stack([getattr(m, name).weight.t() for m in self.models]).contiguous(),
+                 torch.stack([getattr(m, name).bias for m in self.models]).unsqueeze(1))
+                for name in ("fc1", "fc2", "fc3")
+            ]
+
+    def q_values(self, states):
+        """Q-values of (n_ramps x state_size) states, or of (batch x n_ramps x state_size) states."""
+        x = torch.as_tensor(np.asarray(states), dtype=torch.float32)
+        with torch.inference_mode():
+            if self.shared:
+                return self.models[0](x)
+            if x.shape[-2] != self.num_ramps:
+                raise ValueError(f"Expected states for {self.num_ramps} ramps, got shape {tuple(x.shape)}")
+            # Ramp-major layout for the batched matmuls: (ramps, batch, features)
+            x = x.unsqueeze(0) if x.dim() == 2 else x
+            x = x.transpose(0, 1)
+            for i, (weight, bias) in enumerate(self.layers):
+                x = torch.baddbmm(bias, x, weight)
+                if i < len(self.layers) - 1:
+                    x = torch.relu(x)
+            x = x.transpose(0, 1)
+            return x.squeeze(0) if np.ndim(states) == 2 else x
+
+    def act(self, states, epsilon=None):
+        q_values = self.q_values(states)
+        actions = q_values.argmax(dim=-1).numpy().reshape(-1)
+        epsilon = self.epsilon if epsilon is None else epsilon
+        # Per-ramp epsilon applies to every batch row of that ramp
+        if np.ndim(epsilon):
+            epsilon = np.broadcast_to(epsilon, q_values.shape[:-1]).reshape(-1)
+        return explore(actions, epsilon, self.action_size).reshape(q_values.shape[:-1])
@@ -0,0 +1,289 @@
+import os
+import numpy as np
+import multiprocessing as mp
+
+from dqn_model.sensors import SensorReader
+from dqn_model.detector_registry import load_layout
+from dqn_model.calibration import load_calibration
+from dqn_model.snapshots import make_snapshot, load_options
+from dqn_model.aggregator import DetectorAggregator
+from dqn_model.profiler import NULL_PROFILER
+from dqn_model.trace import TraceWriter
+from dqn_model.metering import MeterController
+from dqn_model.sim_backend import start
+
+# Constants
+SUMO_PATH = os.path.join("sumo_network", "data", "simulation.sumocfg")
+
+# ALPHA and BETA were discovered using the calibrate.py file.
+# They are only the fallback: a calibration table written by misc_scripts/calibrate_sweep.py takes precedence.
+ALPHA = 5601.0
+BETA = 4238.26
+
+CONTROL_INTERVAL = 15
+MAX_STEPS = 3600
+MAX_SPEED, MAX_OCC, MAX_QUEUE, MAX_FLOW = 30.0, 100.0, 20.0, 2000.0
+
+ACTION_SIZE = 2  # 0 = free flow (green), 1 = metering (2s green / 4s red)
+
+# Order of the interval averages (also the keys of the plotting histories)
+AVERAGE_KEYS = ['speed15m', 'speed225m', 'speed475m',
+                'occ15m', 'occ225m', 'occ475m',
+                'flow15m', 'flow225m', 'flow475m',
+                'queue']
+
+
+def average_keys(layout):
+    # Keys of DetectorAggregator.emit() for `layout`: [speed_g..., occ_g..., flow_g..., queue],
+    # each detector group labelled by its position on the edge (15.0 -> '15m')
+    locations = [f"{g.pos:g}m" for g in layout.groups]
+    return [f"{q}{loc}" for q in ('speed', 'occ', 'flow') for loc in locations] + ['queue']
+
+
+def check_layout(layout):
+    """Raises ValueError if the detectors / ramps of a network don't fit the training schema."""
+    keys = average_keys(layout)
+    if keys != AVERAGE_KEYS:
+        raise ValueError(f"Detector groups {[g.name for g in layout.groups]} give the averages {keys}, "
+                         f"the state needs {AVERAGE_KEYS}")
+    if len(layout.ramps) != 1:
+        raise ValueError(f"RampMeteringEnv controls exactly one ramp meter, the network has {len(layout.ramps)}")
+
+
+def averages_from(means, keys=AVERAGE_KEYS):
+    # DetectorAggregator.emit() values by key (AVERAGE_KEYS, or average_keys(layout))
+    if len(means) != len(keys):
+        raise ValueError(f"{len(means)} interval averages for the {len(keys)} keys {keys}")
+    return {k: float(v) for k, v in zip(keys, means)}
+
+
+# Training schema: the average behind each entry of the state vector, in order
+STATE_KEYS = ['speed15m', 'occ15m',
+              'speed225m', 'occ225m',
+              'speed475m', 'occ475m',
+              'flow15m', 'flow225m', 'flow475m',
+              'queue']
+STATE_SIZE = len(STATE_KEYS)
+
+# Normalisation of each entry, by the kind of average (flow: approx max 2000 veh/h)
+STATE_SCALES = {'speed': MAX_SPEED, 'occ': MAX_OCC, 'flow': MAX_FLOW, 'queue': MAX_QUEUE}
+_KEY_SCALES = [(k, next(s for prefix, s in STATE_SCALES.items() if k.startswith(prefix))) for k in STATE_KEYS]
+
+
+def build_state(avg_vals):
+    # Normalised state vector in STATE_KEYS order, same layout the agent was trained on
+    return np.array([avg_vals[k] / scale for k, scale in _KEY_SCALES], dtype=np.float32)
+
+
+def check_state_layout(model_state):
+    """Raises ValueError if a saved network does not take STATE_SIZE inputs / give ACTION_SIZE outputs."""
+    inputs, outputs = model_state['fc1.weight'].shape[1], model_state['fc3.weight'].shape[0]
+    if (inputs, outputs) != (STATE_SIZE, ACTION_SIZE):
+        raise ValueError(f"Network expects {inputs} state entries / {outputs} actions, "
+                         f"the environment produces {STATE_SIZE} / {ACTION_SIZE}")
+
+
+def meter_phase(action, step):
+    # Light phase for `action` at simulation step `step`
+    if action == 0:
+        # FREE FLOW
+        return 0 # Green
+    # METERING (The "Smart Red")
+    # E.g., 2 seconds Green, 4 seconds Red cycle
+    cycle_position = step % 6
+    if cycle_position < 2:
+        return 0 # Green (Release 1 car)
+    return 2 # Red (Hold back)
+
+
+def compute_reward(tts, alpha=ALPHA, beta=BETA):
+    # TTS-based reward from the paper, calibrated with alpha (max TTS) and beta (mean TTS)
+    return float(np.clip((alpha - tts) / beta, -1.0, 1.0))
+
+
+# The ramp-metering simulation as a Gymnasium-style environment.
+# reset() runs SUMO up to the first decision point; step(action) applies the action for one
+# control interval (CONTROL_INTERVAL simulation seconds) and returns the next state.
+# With warmup_steps > 0 the episode starts from a saved snapshot of the first warmup_steps
+# seconds (simulated once per seed with the light green, see snapshots.py).
+# With trace_dir set, every simulation step is appended to trace_dir/<label>.trace (see trace.py).
+class RampMeteringEnv:
+    def __init__(self, label="default", seed=None, sumo_path=SUMO_PATH,
+                 control_interval=CONTROL_INTERVAL, max_steps=MAX_STEPS, demand_scale=1.0,
+                 warmup_steps=0, profiler=NULL_PROFILER, trace_dir=None, sumo_binary="sumo"):
+        if warmup_steps % control_interval != 0:
+            raise ValueError(f"warmup_steps ({warmup_steps}) must be a multiple of the control interval ({control_interval})")
+        self.label = label
+        self.seed = seed
+        self.sumo_path = sumo_path
+        self.control_interval = control_interval
+        self.max_steps = max_steps
+        self.demand_scale = demand_scale
+        self.warmup_steps = warmup_steps
+        self.profiler = profiler
+        self.trace_dir = trace_dir
+        self.trace = None
+        self.sumo_binary = sumo_binary  # "sumo-gui" to watch the episode (traci backend only)
+
+        # Reward calibration for this network / demand, falling back to the hard-coded values
+        calibration = load_calibration(sumo_path, demand_scale, control_interval, max_steps)
+        self.alpha, self.beta = calibration if calibration is not None else (ALPHA, BETA)
+
+        # Detector groups, ramp lanes and the ramp-meter traffic light from the SUMO files
+        # (tl_id is None for a network without a ramp meter, e.g. no_control/)
+        self.layout = load_layout(sumo_path)
+        check_layout(self.layout)
+        self.tl_id = self.layout.ramps[0].tl_id
+
+        self.conn = None
+        self.sensors = None
+        self.meter = None
+
+    def reset(self, seed=None):
+        """Starts a new episode. Returns (state, info) at the first decision point."""
+        self.close()
+        if seed is not None:
+            self.seed = seed
+
+        sumo_cmd = [self.sumo_binary, "-c", self.sumo_path, "--no-warnings", "--no-step-log"]
+        if self.demand_scale != 1.0:
+            sumo_cmd += ["--scale", str(self.demand_scale)]
+        if self.warmup_steps:
+            # Skip the warmup: start from its snapshot (simulated on first use)
+            sumo_cmd += load_options(make_snapshot(sumo_cmd, self.seed, self.warmup_steps), self.warmup_steps)
+        if self.seed is not None:
+            sumo_cmd += ["--seed", str(self.seed)]
+        if os.path.basename(self.sumo_binary).startswith("sumo-gui"):
+            sumo_cmd += ["--start"]
+        # Each SUMO instance gets its own labelled TraCI connection so several can run side by side
+        with self.profiler.span("sumo_start"):
+            self.conn = start(sumo_cmd, label=self.label)
+            self.sensors = SensorReader(self.conn, self.layout)
+        with self.profiler.span("set_phase"):
+            # The meter's signal programs run inside SUMO (see metering.py)
+            self.meter = MeterController(self.conn, self.tl_id) if self.tl_id is not None else None
+
+        self.step_count = self.warmup_steps
+        if self.trace_dir is not None:
+            if self.trace is None:
+                self.trace = TraceWriter(os.path.join(self.trace_dir, f"{self.label}.trace"), self.layout,
+                                         sumo_path=self.sumo_path, control_interval=self.control_interval,
+                                         demand_scale=self.demand_scale, max_steps=self.max_steps,
+                                         alpha=self.alpha, beta=self.beta)
+            self.trace.begin_episode()
+        self.aggregator = DetectorAggregator(self.layout.group_sizes)
+        self.aggregator.update_from(self.sensors)
+
+        # No decision has been taken yet: the light stays green until the first interval ends
+        state, reward, _, info = self._advance(0)
+        info['reward'] = reward
+        return state, info
+
+    def step(self, action):
+        """Applies `action` for one control interval. Returns (state, reward, terminated, truncated, info)."""
+        state, reward, truncated, info = self._advance(action)
+        return state, reward, False, truncated, info
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if self.trace is not None:
+            self.trace.flush()
+
+    def _apply_action(self, action):
+        # Switches the meter's program if the action changed. Returns the phase SUMO runs
+        # this step (-1 without a ramp meter); it follows from the clock, nothing is read back.
+        if self.meter is None:
+            return -1
+        self.meter.apply(action, self.step_count)
+        return meter_phase(action, self.step_count)
+
+    def _advance(self, action):
+        # Simulate until the next decision point, accumulating TTS and detector readings
+        profiler = self.profiler
+        cumulative_veh = 0
+        while True:
+            with profiler.span("set_phase"):
+                phase = self._apply_action(action)
+            if self.trace is not None:
+                self.trace.append(self.step_count, action, phase, self.sensors.min_expected, self.sensors)
+            cumulative_veh += self.sensors.min_expected
+            with profiler.span("sim_step"):
+                self.conn.simulationStep()
+            with profiler.span("sensors"):
+                self.sensors.update()
+            self.step_count += 1
+
+            with profiler.span("aggregate"):
+                self.aggregator.update_from(self.sensors)
+            if self.step_count % self.control_interval == 0:
+                break
+
+        with profiler.span("aggregate"):
+            avg_vals = averages_from(self.aggregator.emit())
+
+        truncated = self.step_count >= self.max_steps
+        if truncated and self.trace is not None:
+            # Final readings of the episode
+            self.trace.append(self.step_count, -1, -1, self.sensors.min_expected, self.sensors)
+        info = {'averages': avg_vals, 'tts': cumulative_veh, 'step': self.step_count}
+        return build_state(avg_vals), compute_reward(cumulative_veh, self.alpha, self.beta), truncated, info
+
+
+def _env_worker(remote, env_kwargs):
+    env = RampMeteringEnv(**env_kwargs)
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "reset":
+                remote.send(env.reset(seed=data))
+            elif cmd == "step":
+                remote.send(env.step(data))
+            elif cmd == "close":
+                break
+    finally:
+        env.close()
+        remote.close()
+
+
+# K RampMeteringEnvs, each in its own subprocess, stepped in lockstep.
+# Observations and rewards come back stacked so the policy can act on all of them in one forward pass.
+# All episodes have the same length, so every environment finishes on the same step.
+class VectorEnv:
+    def __init__(self, num_envs, **env_kwargs):
+        self.num_envs = num_envs
+        ctx = mp.get_context("spawn")
+
+        self.remotes, self.processes = [], []
+        for i in range(num_envs):
+            parent, child = ctx.Pipe()
+            kwargs = dict(env_kwargs, label=f"env{i}")
+            p = ctx.Process(target=_env_worker, args=(child, kwargs), daemon=True)
+            p.start()
+            child.close()
+            self.remotes.append(parent)
+            self.processes.append(p)
+
+    def reset(self, seeds=None):
+        """Returns (states, infos) with states of shape (num_envs, STATE_SIZE)."""
+        if seeds is None:
+            seeds = [None] * self.num_envs
+        for remote, seed in zip(self.remotes, seeds):
+            remote.send(("reset", seed))
+        states, infos = zip(*[remote.recv() for remote in self.remotes])
+        return np.stack(states), list(infos)
+
+    def step(self, actions):
+        """Returns (states, rewards, terminated, truncated, infos) stacked over the environments."""
+        for remote, action in zip(self.remotes, actions):
+            remote.send(("step", int(action)))
+        states, rewards, terminated, truncated, infos = zip(*[remote.recv() for remote in self.remotes])
+        return (np.stack(states), np.array(rewards, dtype=np.float32),
+                np.array(terminated), np.array(truncated), list(infos))
+
+    def close(self):
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for p in self.processes:
+            p.join()
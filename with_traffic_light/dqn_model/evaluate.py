@@ -0,0 +1,159 @@
+import os
+import re
+import sys
+import csv
+import json
+import glob
+import argparse
+import multiprocessing as mp
+import numpy as np
+import torch
+from tqdm import tqdm
+
+# Path setup
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn_model.dqn_agent import DQN
+from dqn_model.env import RampMeteringEnv, STATE_SIZE, ACTION_SIZE, check_state_layout
+from dqn_model.calibration import mean_ci
+from dqn_model.sim_backend import BACKENDS, set_backend
+from dqn_model.snapshots import WARMUP_STEPS
+
+# Headless evaluation of saved policies.
+# Every model is run greedily (epsilon = 0) for one episode per evaluation seed, with the
+# (model, seed) runs spread over a pool of SUMO processes. Per model it reports the mean and 95%
+# confidence interval of the total time spent, the mean ramp queue and the mean mainline speed.
+# The networks are checked against the training state schema before anything is simulated.
+#
+# Usage: python dqn_model/evaluate.py models/ --seeds 10 --workers 4 --no-control
+
+MODELS_DIR = "models"
+EVAL_SEED = 1000  # Evaluation seeds start here, away from the training seeds
+METRICS = ["tts", "queue", "speed", "reward"]
+NO_CONTROL = "no_control"
+
+
+def model_paths(paths):
+    # Directories expand to best_model.pth followed by model_ep*.pth in episode order
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        best = os.path.join(path, "best_model.pth")
+        if os.path.exists(best):
+            found.append(best)
+        episodes = glob.glob(os.path.join(path, "model_ep*.pth"))
+        found += sorted(episodes, key=lambda p: int(re.search(r"model_ep(\d+)", p).group(1)))
+    return found
+
+
+def load_model(path):
+    model_state = torch.load(path)
+    check_state_layout(model_state)
+    model = DQN(STATE_SIZE, ACTION_SIZE)
+    model.load_state_dict(model_state)
+    model.eval()
+    return model
+
+
+def _evaluate_run(job):
+    name, path, seed, env_kwargs = job
+    torch.set_num_threads(1)
+    model = load_model(path) if path is not None else None
+
+    env = RampMeteringEnv(label=f"eval{os.getpid()}", seed=seed, **env_kwargs)
+    state, info = env.reset()
+    delta_t = env.conn.simulation.getDeltaT()
+    tts, reward = info['tts'], info['reward']
+    queues, speeds = [], []
+
+    truncated = False
+    while not truncated:
+        if model is None:
+            action = 0  # Light held green
+        else:
+            with torch.inference_mode():
+                action = model(torch.as_tensor(state).unsqueeze(0)).argmax().item()
+        state, r, _, truncated, info = env.step(action)
+        avg = info['averages']
+        tts += info['tts']
+        reward += r
+        queues.append(avg['queue'])
+        speeds.append((avg['speed15m'] + avg['speed225m'] + avg['speed475m']) / 3)
+    env.close()
+
+    # TTS in vehicle-hours, speed in m/s
+    return name, seed, {"tts": tts * delta_t / 3600, "queue": float(np.mean(queues)),
+                        "speed": float(np.mean(speeds)), "reward": float(reward)}
+
+
+def evaluate(paths, seeds, workers=None, no_control=False, **env_kwargs):
+    """Runs every model over every seed. Returns {model name: {metric: (mean, [lo, hi])}} in model order."""
+    models = {os.path.splitext(os.path.basename(p))[0]: p for p in paths}
+    for path in models.values():
+        load_model(path)  # Fail before simulating anything
+    if no_control:
+        models = {NO_CONTROL: None, **models}
+
+    jobs = [(name, path, seed, env_kwargs) for name, path in models.items() for seed in seeds]
+    runs = {name: [] for name in models}
+    ctx = mp.get_context("spawn")
+    # Runs from warmup snapshots are only reproducible in a fresh process (see snapshots.py)
+    fresh = 1 if env_kwargs.get("warmup_steps") else None
+    with ctx.Pool(workers, maxtasksperchild=fresh) as pool:
+        for name, seed, result in tqdm(pool.imap_unordered(_evaluate_run, jobs), total=len(jobs),
+                                       desc="Evaluation runs"):
+            runs[name].append(result)
+
+    return {name: {m: mean_ci([r[m] for r in results]) for m in METRICS} for name, results in runs.items()}
+
+
+def format_table(results, num_seeds):
+    lines = [f"{'model':16s} {'TTS (veh.h)':>22s} {'ramp queue (veh)':>22s} "
+             f"{'mainline speed (m/s)':>22s} {'reward':>22s}   ({num_seeds} seeds, 95% CI)"]
+    for name, metrics in results.items():
+        cells = [f"{mean:9.2f} [{lo:.2f}, {hi:.2f}]" for mean, (lo, hi) in (metrics[m] for m in METRICS)]
+        lines.append(f"{name:16s} " + " ".join(f"{c:>22s}" for c in cells))
+    return "\n".join(lines)
+
+
+def write_results(results, path):
+    rows = [dict(model=name, metric=m, mean=mean, ci_low=lo, ci_high=hi)
+            for name, metrics in results.items() for m, (mean, (lo, hi)) in metrics.items()]
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as fh:
+            writer = csv.DictWriter(fh, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate saved models over many seeds, without the GUI")
+    parser.add_argument("models", nargs="*", default=[MODELS_DIR],
+                        help="Model files, or directories with best_model.pth / model_ep*.pth (default: models/)")
+    parser.add_argument("--seeds", type=int, default=10, help="Evaluation episodes per model")
+    parser.add_argument("--first-seed", type=int, default=EVAL_SEED)
+    parser.add_argument("--workers", type=int, default=None, help="Parallel SUMO processes (default: all cores)")
+    parser.add_argument("--no-control", action="store_true", help="Also evaluate the light held green, for reference")
+    parser.add_argument("--warmup", type=int, nargs="?", const=WARMUP_STEPS, default=0,
+                        help=f"Start the episodes from warmup snapshots (default when given: {WARMUP_STEPS}s)")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="SUMO backend (default: $SUMO_BACKEND or traci)")
+    parser.add_argument("--out", default=None, help="Also write the table to this .json or .csv file")
+    args = parser.parse_args()
+    if args.backend:
+        set_backend(args.backend)
+
+    paths = model_paths(args.models)
+    if not paths:
+        parser.error(f"no models found in {', '.join(args.models)}")
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+
+    results = evaluate(paths, seeds, args.workers, args.no_control, warmup_steps=args.warmup)
+    print(format_table(results, args.seeds))
+    if args.out:
+        write_results(results, args.out)
+        print(f"Results written to {args.out}")
@@ -1,21 +1,162 @@
-import matplotlib.pyplot as plt
+import os
+import time
+import queue
+import multiprocessing as mp
 import numpy as np
 
-def init_plot():
-    plt.ion()
-    fig, ax = plt.subplots()
-    line, = ax.plot([], [], color='tab:blue', marker='o', linestyle='-')
-    ax.set_title("Live Training Performance")
-    ax.set_xlabel("Episode")
-    ax.set_ylabel("Total Score")
+# Live training dashboard, drawn off the training loop.
+# The loop only publishes its results (episode score + interval histories) to a multiprocessing
+# queue, which returns immediately; a separate renderer process owns matplotlib. The renderer
+# redraws at most once every `min_interval` seconds, either in a window or, on headless machines,
+# as PNG snapshots written atomically to a directory. Plotting can never stall run_simulation.
 
-    return line, ax, fig
+CONTROL_INTERVAL = 15
+MIN_INTERVAL = 2.0  # Seconds between redraws
+SNAPSHOT_NAME = "dashboard.png"
+MODES = ("window", "png", "none")
 
-def update_live_plot(scores, line, ax, fig):
-    x = range(len(scores))
-    line.set_data(x, scores)
 
-    ax.relim()
-    ax.autoscale_view()
-    fig.canvas.draw()
-    fig.canvas.flush_events()
\ No newline at end of file
+def default_mode():
+    # A window needs a display and an interactive matplotlib backend
+    if os.environ.get("MPLBACKEND", "").lower() == "agg":
+        return "png"
+    if os.name == "posix" and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+        return "png"
+    return "window"
+
+
+def draw_histories(axs, h, control_interval=CONTROL_INTERVAL):
+    # Speed / occupancy / queue / cumulative reward of one episode on a 2x2 grid of axes
+    ctrl_time = np.arange(len(h['queue'])) * control_interval
+    rew_time = np.arange(len(h['reward'])) * control_interval
+
+    # Speed
+    for loc in ['15m', '225m', '475m']:
+        axs[0, 0].plot(ctrl_time, h[f'speed{loc}'], label=loc)
+    axs[0, 0].set_title("Speed (m/s)"); axs[0, 0].legend()
+
+    # Occupancy
+    for loc in ['15m', '225m', '475m']:
+        axs[0, 1].plot(ctrl_time, h[f'occ{loc}'], label=loc)
+    axs[0, 1].set_title("Occupancy (%)"); axs[0, 1].legend()
+
+    # Queue
+    axs[1, 0].plot(ctrl_time, h['queue'], color='tab:red')
+    axs[1, 0].set_title("Queue Length"); axs[1, 0].set_xlabel("Time (s)")
+
+    # Cumulative Reward
+    axs[1, 1].plot(rew_time, h['reward'], color='tab:green', linewidth=2)
+    axs[1, 1].set_title("Cumulative Reward"); axs[1, 1].set_xlabel("Time (s)")
+    axs[1, 1].axhline(0, color='black', linestyle='--', linewidth=1, alpha=0.7)
+
+
+def _render(fig, score_ax, history_axs, episodes, scores, latest):
+    score_ax.clear()
+    score_ax.plot(episodes, scores, color='tab:blue', marker='o', linestyle='-')
+    score_ax.set_title("Live Training Performance")
+    score_ax.set_xlabel("Episode")
+    score_ax.set_ylabel("Total Score")
+
+    for ax in history_axs.flat:
+        ax.clear()
+    if latest is not None:
+        episode, histories, control_interval = latest
+        draw_histories(history_axs, histories, control_interval)
+        fig.suptitle(f"Episode {episode}")
+    fig.tight_layout()
+
+
+def _save(fig, directory):
+    # Written next to the final file and renamed, so readers never see a half-written image
+    path = os.path.join(directory, SNAPSHOT_NAME)
+    tmp_path = path + ".tmp.png"
+    fig.savefig(tmp_path, dpi=100)
+    os.replace(tmp_path, path)
+
+
+def _renderer_loop(inbox, mode, directory, min_interval):
+    import matplotlib.pyplot as plt
+    if mode == "png":
+        plt.switch_backend("Agg")
+        os.makedirs(directory, exist_ok=True)
+    else:
+        plt.ion()
+
+    fig = plt.figure(figsize=(14, 12))
+    grid = fig.add_gridspec(3, 2)
+    score_ax = fig.add_subplot(grid[0, :])
+    history_axs = np.array([[fig.add_subplot(grid[r, c]) for c in range(2)] for r in (1, 2)])
+
+    episodes, scores, latest = [], [], None
+    dirty, closed, last_draw = False, False, 0.0
+    while not closed:
+        # Drain everything published since the last pass (the newest histories win)
+        try:
+            message = inbox.get(timeout=min_interval / 4)
+            while True:
+                if message is None:
+                    closed = True
+                else:
+                    episode, score, histories, control_interval = message
+                    episodes.append(episode)
+                    scores.append(score)
+                    if histories is not None:
+                        latest = (episode, histories, control_interval)
+                    dirty = True
+                message = inbox.get_nowait()
+        except queue.Empty:
+            pass
+
+        # Rate-limited redraw
+        now = time.monotonic()
+        if dirty and (closed or now - last_draw >= min_interval):
+            _render(fig, score_ax, history_axs, episodes, scores, latest)
+            if mode == "png":
+                _save(fig, directory)
+            else:
+                fig.canvas.draw_idle()
+            dirty, last_draw = False, now
+        if mode == "window":
+            fig.canvas.flush_events()
+
+    if mode == "window":
+        # Keep the final dashboard open until the window is closed
+        plt.ioff()
+        plt.show()
+
+
+class Dashboard:
+    """Publishes training results to a renderer process; publish() never waits on the renderer."""
+
+    def __init__(self, mode=None, directory="plots", min_interval=MIN_INTERVAL):
+        self.mode = mode or default_mode()
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown dashboard mode '{self.mode}', expected one of {MODES}")
+        self.process = None
+        if self.mode == "none":
+            return
+
+        ctx = mp.get_context("spawn")
+        self.inbox = ctx.Queue()
+        self.process = ctx.Process(target=_renderer_loop, args=(self.inbox, self.mode, directory, min_interval))
+        self.process.start()
+
+    def publish(self, episode, score, histories=None, control_interval=CONTROL_INTERVAL):
+        if self.process is None:
+            return
+        # Queue.put hands the message to a feeder thread and returns immediately
+        if histories is not None:
+            histories = {k: np.asarray(v, dtype=np.float32) for k, v in histories.items()}
+        self.inbox.put((episode, float(score), histories, control_interval))
+
+    def close(self, wait=True):
+        """Draws the final state. With a window, `wait` blocks until the user closes it."""
+        if self.process is None:
+            return
+        self.inbox.put(None)
+        if wait or self.mode == "png":
+            self.process.join()
+        # Don't hang at exit on messages a dead renderer never read
+        self.inbox.cancel_join_thread()
+        self.inbox.close()
+        self.process = None
@@ -0,0 +1,65 @@
+# Ramp-meter signal programs, run by SUMO itself.
+# Instead of writing the light phase over TraCI every simulation second, two programs are
+# installed on the ramp-meter traffic light once per simulation:
+#   FREE_PROGRAM  - green, held indefinitely (action 0, and the no-control baseline)
+#   METER_PROGRAM - METER_GREEN_S green / METER_RED_S red cycle (action 1, "the Smart Red")
+# and the controller only switches programs when the action changes. The metering cycle stays
+# aligned with the simulation clock (green while step % 6 < 2, as env.meter_phase), so the
+# signal timing is identical to setting the phase every second.
+
+FREE_PROGRAM = "rl_free"
+METER_PROGRAM = "rl_meter"
+METER_GREEN_S = 2
+METER_RED_S = 4
+HOLD_S = 1e7  # Duration of the free-flow green phase (longer than any episode)
+
+# Phases of the network's own program (see the tlLogic in the .net.xml)
+GREEN_PHASE = 0
+RED_PHASE = 2
+
+
+def install_programs(conn, tl_id):
+    """Adds the free-flow and metering programs to `tl_id` (the free-flow one ends up active)."""
+    tls = conn.trafficlight
+    phases = tls.getAllProgramLogics(tl_id)[0].phases
+    green, red = phases[GREEN_PHASE].state, phases[RED_PHASE].state
+    tls.setProgramLogic(tl_id, tls.Logic(METER_PROGRAM, 0, 0,
+                                         [tls.Phase(METER_GREEN_S, green), tls.Phase(METER_RED_S, red)]))
+    tls.setProgramLogic(tl_id, tls.Logic(FREE_PROGRAM, 0, 0, [tls.Phase(HOLD_S, green)]))
+
+
+def hold_green_for(conn, tl_id, seconds):
+    # Holds the network's own green phase for `seconds`, without adding programs (no-control runs
+    # and warmup snapshots: a saved state lists every program, and loading it needs them all)
+    conn.trafficlight.setPhase(tl_id, GREEN_PHASE)
+    conn.trafficlight.setPhaseDuration(tl_id, seconds)
+
+
+class MeterController:
+    """Switches the ramp meter between the installed programs, only when the action changes."""
+
+    def __init__(self, conn, tl_id):
+        self.conn = conn
+        self.tl_id = tl_id
+        self.action = 0
+        self.switches = 0
+        install_programs(conn, tl_id)
+
+    def apply(self, action, step):
+        if action == self.action:
+            return
+        tls = self.conn.trafficlight
+        if action == 0:
+            tls.setProgram(self.tl_id, FREE_PROGRAM)
+        else:
+            # Enter the cycle where the clock is: green for step % 6 < 2, red for the rest
+            position = step % (METER_GREEN_S + METER_RED_S)
+            tls.setProgram(self.tl_id, METER_PROGRAM)
+            if position < METER_GREEN_S:
+                tls.setPhase(self.tl_id, 0)
+                tls.setPhaseDuration(self.tl_id, METER_GREEN_S - position)
+            else:
+                tls.setPhase(self.tl_id, 1)
+                tls.setPhaseDuration(self.tl_id, METER_GREEN_S + METER_RED_S - position)
+        self.action = action
+        self.switches += 1
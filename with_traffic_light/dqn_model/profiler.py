@@ -0,0 +1,134 @@
+import csv
+import json
+import time
+from contextlib import nullcontext
+
+# Hot-path profiler.
+# Wall time of the training / evaluation loops is split into named phases (TraCI calls, sensor
+# aggregation, act, replay, plotting ...). Each span is timed with the monotonic
+# perf_counter_ns clock and only updates a handful of counters and a log2 histogram, so leaving
+# it on costs well under a microsecond per span. Disabled runs use NULL_PROFILER, whose spans
+# are a shared no-op context manager.
+
+NUM_BUCKETS = 32  # Histogram bucket i holds durations in [2^(i-1), 2^i) microseconds
+CSV_FIELDS = ["episode", "phase", "count", "total_s", "mean_us", "p50_us", "p95_us", "max_us"]
+
+
+class PhaseStats:
+    __slots__ = ("count", "total_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * NUM_BUCKETS
+
+    def add(self, ns):
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.buckets[min((ns // 1000).bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def percentile(self, q):
+        # Upper edge of the histogram bucket containing the q-quantile (microseconds), capped at the max
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min(float(1 << i), self.max_ns / 1e3)
+        return self.max_ns / 1e3
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_s": self.total_ns / 1e9,
+            "mean_us": self.total_ns / self.count / 1e3 if self.count else 0.0,
+            "p50_us": self.percentile(0.5),
+            "p95_us": self.percentile(0.95),
+            "max_us": self.max_ns / 1e3,
+            "hist_us": self.buckets[:max(i + 1 for i, n in enumerate(self.buckets) if n)] if self.count else [],
+        }
+
+
+class _Span:
+    __slots__ = ("stats", "start")
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        self.stats.add(time.perf_counter_ns() - self.start)
+
+
+class Profiler:
+    enabled = True
+
+    def __init__(self, path=None):
+        self.path = path  # .json or .csv, rewritten after every episode
+        self.summaries = []
+        self._reset()
+
+    def _reset(self):
+        self.phases = {}
+        self.spans = {}
+        self.episode_start = time.perf_counter_ns()
+
+    def span(self, name):
+        """Context manager timing one occurrence of phase `name`."""
+        span = self.spans.get(name)
+        if span is None:
+            self.phases[name] = PhaseStats()
+            span = self.spans[name] = _Span(self.phases[name])
+        return span
+
+    def end_episode(self, episode, **extra):
+        """Closes the per-episode statistics, stores their summary and writes the dump file."""
+        wall_s = (time.perf_counter_ns() - self.episode_start) / 1e9
+        phases = {name: stats.summary() for name, stats in self.phases.items()}
+        tracked_s = sum(p["total_s"] for p in phases.values())
+        summary = dict(episode=episode, wall_s=wall_s, untracked_s=wall_s - tracked_s, phases=phases, **extra)
+        self.summaries.append(summary)
+        if self.path:
+            self.write(self.path)
+        self._reset()
+        return summary
+
+    def write(self, path):
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as fh:
+                writer = csv.DictWriter(fh, fieldnames=CSV_FIELDS, extrasaction="ignore")
+                writer.writeheader()
+                for s in self.summaries:
+                    for phase, stats in s["phases"].items():
+                        writer.writerow(dict(stats, episode=s["episode"], phase=phase))
+        else:
+            with open(path, "w") as fh:
+                json.dump(self.summaries, fh, indent=2)
+
+
+class NullProfiler:
+    enabled = False
+    _span = nullcontext()
+
+    def span(self, name):
+        return self._span
+
+    def end_episode(self, episode, **extra):
+        return None
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def format_summary(summary):
+    # One line per phase, slowest first, for printing after an episode
+    lines = [f"Episode {summary['episode']}: {summary['wall_s']:.2f}s wall, {summary['untracked_s']:.2f}s untracked"]
+    for name, p in sorted(summary["phases"].items(), key=lambda kv: -kv[1]["total_s"]):
+        lines.append(f"  {name:12s} {p['total_s']:8.3f}s {p['count']:8d}x  mean {p['mean_us']:9.1f}us  "
+                     f"p95 <{p['p95_us']:9.0f}us  max {p['max_us']:9.1f}us")
+    return "\n".join(lines)
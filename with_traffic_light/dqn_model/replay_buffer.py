@@ -0,0 +1,187 @@
+import os
+import numpy as np
+import torch
+
+# Ring buffer for experience replay.
+# Every field lives in one preallocated array, so inserting is O(1) and sampling a
+# minibatch is a single fancy-index per field (no Python tuples, no deque indexing).
+class ReplayBuffer:
+    FIELDS = ("states", "actions", "rewards", "next_states", "dones", "steps")
+
+    def __init__(self, capacity, state_size):
+        self.capacity = capacity
+        self.state_size = state_size
+
+        self.states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+        self.steps = np.ones(capacity, dtype=np.int64)  # Control intervals the action was held (action repeat)
+
+        self.pos = 0   # Next slot to write
+        self.size = 0  # Number of valid transitions
+
+    def __len__(self):
+        return self.size
+
+    def push(self, state, action, reward, next_state, done, steps=1):
+        # Overwrite the oldest transition once the buffer is full
+        i = self.pos
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.steps[i] = steps
+
+        self.pos = (self.pos + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, states, actions, rewards, next_states, dones, steps=None):
+        """Bulk insert of whole arrays of transitions. Returns the slots that were written."""
+        n = min(len(actions), self.capacity)  # Only the newest `capacity` transitions can fit
+        indices = (self.pos + np.arange(n)) % self.capacity
+        self.states[indices] = states[-n:]
+        self.actions[indices] = actions[-n:]
+        self.rewards[indices] = rewards[-n:]
+        self.next_states[indices] = next_states[-n:]
+        self.dones[indices] = dones[-n:]
+        self.steps[indices] = steps[-n:] if steps is not None else 1
+
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return indices
+
+    def sample_indices(self, batch_size):
+        return np.random.randint(0, self.size, size=batch_size)
+
+    def get_batch(self, indices):
+        # torch.from_numpy shares memory with the gathered arrays (no extra copy)
+        return (torch.from_numpy(self.states[indices]),
+                torch.from_numpy(self.actions[indices]),
+                torch.from_numpy(self.rewards[indices]),
+                torch.from_numpy(self.next_states[indices]),
+                torch.from_numpy(self.dones[indices]),
+                torch.from_numpy(self.steps[indices]))
+
+    def sample(self, batch_size):
+        return self.get_batch(self.sample_indices(batch_size))
+
+    def save(self, directory):
+        # One raw .npy file per field: compact, and load() memory-maps them instead of unpickling
+        for name in self.FIELDS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name)[:self.size])
+        return {"capacity": self.capacity, "pos": self.pos, "size": self.size}
+
+    def load(self, directory, meta):
+        if meta["capacity"] != self.capacity:
+            raise ValueError(f"Checkpoint buffer capacity {meta['capacity']} does not match {self.capacity}")
+        size = meta["size"]
+        for name in self.FIELDS:
+            path = os.path.join(directory, f"{name}.npy")
+            if name == "steps" and not os.path.exists(path):
+                # Checkpoints from before action repeat: every action was held for one interval
+                self.steps[:size] = 1
+                continue
+            getattr(self, name)[:size] = np.load(path, mmap_mode="r")
+        self.pos, self.size = meta["pos"], size
+
+
+# Binary sum tree over the transition priorities.
+# Leaves hold priorities, every internal node holds the sum of its children,
+# so updates and prefix-sum lookups are O(log n). Both are done for a whole batch at once.
+class SumTree:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Round the leaf count up to a power of two so every leaf sits at the same depth
+        self.num_leaves = 1 << max(capacity - 1, 1).bit_length()
+        self.tree = np.zeros(2 * self.num_leaves - 1, dtype=np.float64)
+
+    def total(self):
+        return self.tree[0]
+
+    def get(self, data_indices):
+        return self.tree[np.asarray(data_indices) + self.num_leaves - 1]
+
+    def update(self, data_indices, priorities):
+        nodes = np.asarray(data_indices, dtype=np.int64) + self.num_leaves - 1
+        self.tree[nodes] = priorities
+
+        # Recompute the parents one level at a time (duplicates collapse with unique)
+        while nodes[0] > 0:
+            nodes = np.unique((nodes - 1) // 2)
+            self.tree[nodes] = self.tree[2 * nodes + 1] + self.tree[2 * nodes + 2]
+
+    def find(self, values):
+        # Walk down from the root, going right whenever the value exceeds the left sum
+        values = np.array(values, dtype=np.float64)
+        nodes = np.zeros(len(values), dtype=np.int64)
+        while nodes[0] < self.num_leaves - 1:
+            left = 2 * nodes + 1
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values -= np.where(go_right, left_sum, 0.0)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - (self.num_leaves - 1)
+
+
+# Prioritized Experience Replay (Schaul et al., 2016), proportional variant.
+# Transitions are drawn with probability p_i^alpha / sum(p^alpha) and corrected
+# with importance-sampling weights (N * P(i))^-beta.
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4, beta_increment=1e-4, eps=1e-5):
+        super().__init__(capacity, state_size)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+
+    def push(self, state, action, reward, next_state, done, steps=1):
+        # New transitions get the highest priority so they are replayed at least once
+        i = self.pos
+        super().push(state, action, reward, next_state, done, steps)
+        self.tree.update([i], [self.max_priority ** self.alpha])
+
+    def extend(self, states, actions, rewards, next_states, dones, steps=None):
+        indices = super().extend(states, actions, rewards, next_states, dones, steps)
+        self.tree.update(indices, np.full(len(indices), self.max_priority ** self.alpha))
+        return indices
+
+    def sample_indices(self, batch_size):
+        # Stratified sampling: one draw from each equal slice of the total priority mass
+        segment = self.tree.total() / batch_size
+        values = (np.arange(batch_size) + np.random.rand(batch_size)) * segment
+        indices = self.tree.find(values)
+        return np.minimum(indices, self.size - 1)
+
+    def sample(self, batch_size):
+        indices = self.sample_indices(batch_size)
+
+        probs = self.tree.get(indices) / self.tree.total()
+        weights = (self.size * probs) ** (-self.beta)
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        return self.get_batch(indices) + (indices, torch.from_numpy(weights.astype(np.float32)))
+
+    def save(self, directory):
+        meta = super().save(directory)
+        np.save(os.path.join(directory, "priorities.npy"), self.tree.get(np.arange(self.size)))
+        meta.update(beta=self.beta, max_priority=self.max_priority)
+        return meta
+
+    def load(self, directory, meta):
+        super().load(directory, meta)
+        if self.size > 0:
+            priorities = np.load(os.path.join(directory, "priorities.npy"))
+            self.tree.update(np.arange(self.size), priorities)
+        self.beta, self.max_priority = meta["beta"], meta["max_priority"]
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, priorities.max())
+        self.tree.update(indices, priorities ** self.alpha)
@@ -0,0 +1,153 @@
+import os
+import numpy as np
+import traci.constants as tc
+from traci._trafficlight import Logic, Phase
+
+# Recorded-replay stand-in for a TraCI connection.
+# Serves the detector, ramp lane and simulation values captured from one real SUMO run (see
+# benchmarks/bench.py --record), through the subset of the TraCI API the control loop uses.
+# The recorded traffic does not react to the actions, so this is only meant for measuring the
+# Python-side cost of the loop, on machines without SUMO. Selected with SUMO_BACKEND=replay.
+
+REPLAY_FILE = os.environ.get(
+    "SUMO_REPLAY_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "replay_recording.npz"))
+
+
+def save_recording(path, series, layout):
+    # Baseline series (result_cache layout) + the IDs of their columns, stored compactly
+    np.savez_compressed(
+        path,
+        tts=series["tts"].astype(np.int32),
+        speeds=series["speeds"].astype(np.float32),
+        occupancies=series["occupancies"].astype(np.float32),
+        counts=series["counts"].astype(np.int16),
+        halting=series["halting"].astype(np.int16),
+        detector_ids=np.array(layout.detector_ids),
+        ramp_lanes=np.array(layout.ramp_lanes),
+        delta_t=np.float64(series["time"][1] - series["time"][0]) if len(series["time"]) > 1 else np.float64(1.0),
+    )
+
+
+class _Domain:
+    def __init__(self, conn):
+        self.conn = conn
+        self.subscribed = {}
+
+    def subscribe(self, object_id, var_ids):
+        self.subscribed[object_id] = list(var_ids)
+
+
+class _InductionLoopDomain(_Domain):
+    def __init__(self, conn):
+        super().__init__(conn)
+        self.columns = {det_id: i for i, det_id in enumerate(conn.detector_ids)}
+        self.vars = {tc.LAST_STEP_MEAN_SPEED: conn.speeds,
+                     tc.LAST_STEP_OCCUPANCY: conn.occupancies,
+                     tc.LAST_STEP_VEHICLE_NUMBER: conn.counts}
+
+    def _value(self, det_id, var):
+        return self.vars[var][self.conn.row, self.columns[det_id]].item()
+
+    def getAllSubscriptionResults(self):
+        return {det_id: {var: self._value(det_id, var) for var in var_ids}
+                for det_id, var_ids in self.subscribed.items()}
+
+    def getLastStepMeanSpeed(self, det_id):
+        return self._value(det_id, tc.LAST_STEP_MEAN_SPEED)
+
+    def getLastStepOccupancy(self, det_id):
+        return self._value(det_id, tc.LAST_STEP_OCCUPANCY)
+
+    def getLastStepVehicleNumber(self, det_id):
+        return self._value(det_id, tc.LAST_STEP_VEHICLE_NUMBER)
+
+
+class _LaneDomain(_Domain):
+    def __init__(self, conn):
+        super().__init__(conn)
+        self.columns = {lane_id: i for i, lane_id in enumerate(conn.ramp_lanes)}
+
+    def getAllSubscriptionResults(self):
+        return {lane_id: {tc.LAST_STEP_VEHICLE_HALTING_NUMBER: self.getLastStepHaltingNumber(lane_id)}
+                for lane_id in self.subscribed}
+
+    def getLastStepHaltingNumber(self, lane_id):
+        return self.conn.halting[self.conn.row, self.columns[lane_id]].item()
+
+
+class _SimulationDomain(_Domain):
+    def subscribe(self, var_ids):
+        self.subscribed[""] = list(var_ids)
+
+    def getSubscriptionResults(self):
+        return {tc.VAR_MIN_EXPECTED_VEHICLES: self.getMinExpectedNumber()}
+
+    def getMinExpectedNumber(self):
+        return self.conn.tts[self.conn.step % len(self.conn.tts)].item()
+
+    def getTime(self):
+        return self.conn.step * self.conn.delta_t
+
+    def getDeltaT(self):
+        return self.conn.delta_t
+
+
+class _TrafficLightDomain:
+    # Same constructors as traci.trafficlight, for installing programs (see metering.py)
+    Logic = Logic
+    Phase = Phase
+
+    def __init__(self):
+        self.phases = {}
+        self.programs = {}
+
+    def getAllProgramLogics(self, tl_id):
+        # The network's ramp-meter program: green / yellow / red
+        return [self.Logic("0", 0, 0, [self.Phase(80, "GGGGgg"), self.Phase(5, "GGGGyy"),
+                                       self.Phase(5, "GGGGrr")])]
+
+    def setProgramLogic(self, tl_id, logic):
+        self.programs[tl_id] = logic.programID
+        self.phases[tl_id] = logic.currentPhaseIndex
+
+    def setProgram(self, tl_id, program_id):
+        self.programs[tl_id] = program_id
+        self.phases[tl_id] = 0
+
+    def setPhase(self, tl_id, index):
+        self.phases[tl_id] = index
+
+    def setPhaseDuration(self, tl_id, duration):
+        pass
+
+    def getPhase(self, tl_id):
+        return self.phases.get(tl_id, 0)
+
+
+class ReplayConnection:
+    def __init__(self, path=REPLAY_FILE):
+        with np.load(path) as f:
+            self.tts = f["tts"]
+            self.speeds = f["speeds"]
+            self.occupancies = f["occupancies"]
+            self.counts = f["counts"]
+            self.halting = f["halting"]
+            self.detector_ids = [str(d) for d in f["detector_ids"]]
+            self.ramp_lanes = [str(l) for l in f["ramp_lanes"]]
+            self.delta_t = float(f["delta_t"])
+
+        # Runs longer than the recording wrap around to its start
+        self.step = 0
+        self.row = 0
+        self.inductionloop = _InductionLoopDomain(self)
+        self.lane = _LaneDomain(self)
+        self.simulation = _SimulationDomain(self)
+        self.trafficlight = _TrafficLightDomain()
+
+    def simulationStep(self):
+        self.step += 1
+        self.row = self.step % len(self.speeds)
+
+    def close(self):
+        pass
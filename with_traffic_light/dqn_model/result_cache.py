@@ -0,0 +1,188 @@
+import os
+import hashlib
+import subprocess
+import xml.etree.ElementTree as ET
+import numpy as np
+from functools import lru_cache
+
+from dqn_model.sensors import SensorReader
+from dqn_model.detector_registry import load_layout, _split_files
+from dqn_model.sim_backend import start
+from dqn_model.metering import hold_green_for
+
+# Content-addressed cache of baseline (no-control) simulation results.
+# A baseline run is deterministic given its inputs, so its per-step time series are stored on
+# disk under a hash of everything that can change them: the .sumocfg, the network / route /
+# additional files it lists, the extra command-line options, the seed, whether the ramp meters
+# are held green and the SUMO version. Editing any input file gives a new key, so stale results
+# are never returned. The run length is not part of the key: a shorter run is a prefix of a
+# longer one, so it is sliced out of the cached series. The cache directory is bounded in size
+# and the least recently used entries are evicted first.
+#
+# Series layout (all NumPy arrays):
+#   time         (steps,)            simulation time after each step
+#   tts          (steps,)            vehicles in the network + insertion backlog during each step
+#   speeds       (steps + 1, n_det)  detector readings; row 0 is before the first step,
+#   occupancies  (steps + 1, n_det)  row t + 1 after step t (order of layout.detector_ids)
+#   counts       (steps + 1, n_det)
+#   halting      (steps + 1, n_lane) halting vehicles on the ramp lanes (layout.ramp_lanes)
+
+CACHE_DIR = os.environ.get("BASELINE_CACHE_DIR",
+                           os.path.join(os.path.expanduser("~"), ".cache", "ramp_metering", "baselines"))
+MAX_CACHE_MB = float(os.environ.get("BASELINE_CACHE_MB", 512))
+
+# Options that only change logging / GUI behaviour, not the simulation itself
+NON_SEMANTIC_OPTIONS = {"--start", "--quit-on-end", "--no-warnings", "--no-step-log", "-W"}
+INPUT_FILE_OPTIONS = ("net-file", "route-files", "additional-files")
+
+
+@lru_cache(maxsize=None)
+def sumo_version(binary="sumo"):
+    try:
+        out = subprocess.run([binary, "--version"], capture_output=True, text=True, check=True).stdout
+        return out.splitlines()[0].strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _input_files(sumocfg_path):
+    # Network, route and additional files listed in the .sumocfg (resolved against its directory)
+    cfg_dir = os.path.dirname(os.path.abspath(sumocfg_path))
+    files = []
+    for node in ET.parse(sumocfg_path).getroot().iter():
+        if node.tag in INPUT_FILE_OPTIONS:
+            files += [os.path.join(cfg_dir, f) for f in _split_files(node.get("value"))]
+    return files
+
+
+def cache_key(sumo_cmd, seed=None, hold_green=False):
+    """Hash identifying the result of running `sumo_cmd` (for any number of steps)."""
+    args = list(sumo_cmd[1:])
+    i = args.index("-c")
+    sumocfg = args[i + 1]
+    del args[i:i + 2]
+    options = [o for o in args if o not in NON_SEMANTIC_OPTIONS]
+
+    h = hashlib.sha256()
+    h.update(sumo_version().encode())
+    h.update(repr((options, seed, hold_green)).encode())
+    for path in [sumocfg] + _input_files(sumocfg):
+        with open(path, "rb") as fh:
+            h.update(hashlib.sha256(fh.read()).digest())
+    return h.hexdigest()[:32]
+
+
+def simulate_baseline(sumo_cmd, steps, seed=None, hold_green=False, layout=None):
+    """Runs SUMO without an agent and records the per-step time series."""
+    sumocfg = sumo_cmd[sumo_cmd.index("-c") + 1]
+    layout = layout if layout is not None else load_layout(sumocfg)
+    cmd = ["sumo"] + list(sumo_cmd[1:])  # Never open the GUI for a baseline
+    if seed is not None:
+        cmd += ["--seed", str(seed)]
+
+    conn = start(cmd, label=f"baseline{os.getpid()}")
+    sensors = SensorReader(conn, layout)
+    # Without control the ramp meters either keep their static program or are held on green
+    tl_ids = [r.tl_id for r in layout.ramps if r.tl_id is not None] if hold_green else []
+
+    n_det, n_lane = len(layout.detector_ids), len(layout.ramp_lanes)
+    series = {
+        "time": conn.simulation.getTime() + conn.simulation.getDeltaT() * np.arange(1, steps + 1),
+        "tts": np.zeros(steps, dtype=np.int64),
+        "speeds": np.zeros((steps + 1, n_det)),
+        "occupancies": np.zeros((steps + 1, n_det)),
+        "counts": np.zeros((steps + 1, n_det), dtype=np.int32),
+        "halting": np.zeros((steps + 1, n_lane), dtype=np.int32),
+    }
+
+    def record(row):
+        series["speeds"][row] = sensors.speeds
+        series["occupancies"][row] = sensors.occupancies
+        series["counts"][row] = sensors.counts
+        series["halting"][row] = sensors.halting
+
+    record(0)
+    for tl_id in tl_ids:
+        hold_green_for(conn, tl_id, (steps + 1) * conn.simulation.getDeltaT())
+    for t in range(steps):
+        series["tts"][t] = sensors.min_expected
+        conn.simulationStep()
+        sensors.update()
+        record(t + 1)
+    conn.close()
+    return series
+
+
+class ResultCache:
+    def __init__(self, directory=CACHE_DIR, max_mb=MAX_CACHE_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as f:
+                series = {k: f[k] for k in f.files}
+        except (OSError, ValueError):
+            return None
+        os.utime(path)  # Mark as recently used
+        return series
+
+    def put(self, key, series):
+        path = self._path(key)
+        tmp_path = path + f".{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            np.savez_compressed(fh, **series)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        # Drop least recently used entries until the directory fits in max_bytes
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(e[1] for e in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+
+
+def baseline_series(sumo_cmd, steps, seed=None, hold_green=False, cache=None):
+    """Per-step baseline time series, from the cache if this exact run was simulated before."""
+    cache = cache if cache is not None else ResultCache()
+    key = cache_key(sumo_cmd, seed, hold_green)
+    series = cache.get(key)
+    if series is None or len(series["tts"]) < steps:
+        series = simulate_baseline(sumo_cmd, steps, seed, hold_green)
+        cache.put(key, series)
+    return slice_steps(series, steps)
+
+
+def slice_steps(series, steps):
+    # First `steps` steps of a longer run
+    return {k: v[:steps] if k in ("time", "tts") else v[:steps + 1] for k, v in series.items()}
+
+
+def group_counts(series, layout):
+    # Vehicles passing each detector group per step, shape (steps, n_groups)
+    starts = [s.start for s in layout.group_slices]
+    return np.add.reduceat(series["counts"][1:], starts, axis=1)
+
+
+def interval_tts(series, interval):
+    # TTS of each complete control interval
+    tts = series["tts"]
+    n = len(tts) // interval
+    return tts[:n * interval].reshape(n, interval).sum(axis=1)
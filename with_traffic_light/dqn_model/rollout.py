@@ -0,0 +1,166 @@
+import queue
+import random
+import traceback
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from dqn_model.dqn_agent import DQN, epsilon_greedy
+from dqn_model.profiler import NULL_PROFILER
+
+# Parallel rollout subsystem.
+# N worker processes each drive their own SUMO instance (labelled TraCI connection) with a
+# snapshot of the policy, and stream transitions back to the learner in this process.
+# The learner owns the real Agent: it stores the transitions, runs replay() and periodically
+# broadcasts its weights to the workers through a shared-memory copy of the network.
+
+TRANSITION_CHUNK = 8    # Transitions sent per queue message
+SYNC_EVERY = 20         # Worker reloads the shared weights every N decisions
+BROADCAST_EVERY = 50    # Learner publishes its weights every N replay calls
+BASE_SEED = 42
+WORKER_POLL_S = 5.0     # Learner checks that the workers are still alive this often while waiting
+
+
+# Stands in for Agent inside a worker: same interface as used by run_simulation,
+# but learning is delegated to the learner process.
+class RolloutAgent:
+    def __init__(self, worker_id, episode, shared_model, shared_epsilon, lock, out_queue, gamma):
+        self.worker_id = worker_id
+        self.gamma = gamma  # Discounts the rewards of repeated actions
+        self.episode = episode
+        self.shared_model = shared_model
+        self.shared_epsilon = shared_epsilon
+        self.lock = lock
+        self.out_queue = out_queue
+
+        self.action_size = shared_model.fc3.out_features
+        self.model = DQN(shared_model.fc1.in_features, self.action_size)
+        self.model.eval()
+        self.decisions = 0
+        self.pending = []
+        self.sync()
+
+    def sync(self):
+        with self.lock:
+            self.model.load_state_dict(self.shared_model.state_dict())
+            self.epsilon = self.shared_epsilon.value
+
+    def act(self, state):
+        if self.decisions % SYNC_EVERY == 0:
+            self.sync()
+        self.decisions += 1
+
+        # Same epsilon-greedy selection as the learner's Agent
+        return int(epsilon_greedy(self.model, [state], self.epsilon, self.action_size)[0])
+
+    def remember(self, state, action, reward, next_state, done, steps=1):
+        self.pending.append((state, action, reward, next_state, done, steps))
+        if len(self.pending) >= TRANSITION_CHUNK:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.out_queue.put(("transitions", self.worker_id, self.pending))
+            self.pending = []
+
+    def replay(self):
+        # Training happens in the learner
+        pass
+
+    def decay_epsilon(self):
+        # Epsilon is owned by the learner
+        pass
+
+
+def _worker_loop(worker_id, task_queue, out_queue, shared_model, shared_epsilon, lock, gamma, schedule, env_kwargs):
+    # Imported here so the worker process sets up its own TraCI state
+    from dqn_model.run_rl import run_simulation
+
+    torch.set_num_threads(1)
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            episode, seed = task
+
+            random.seed(BASE_SEED + episode)
+            np.random.seed(BASE_SEED + episode)
+
+            agent = RolloutAgent(worker_id, episode, shared_model, shared_epsilon, lock, out_queue, gamma)
+            histories, score = run_simulation(agent, label=f"worker{worker_id}", seed=seed, progress=False,
+                                              schedule=schedule, **env_kwargs)
+            agent.flush()
+            out_queue.put(("episode", worker_id, (episode, histories, score)))
+    except Exception:
+        # Reported to the learner, which would otherwise wait for this worker's episodes forever
+        out_queue.put(("error", worker_id, traceback.format_exc()))
+        raise
+
+
+def train_parallel(agent, episodes, num_workers, start=0, pool=None, profiler=NULL_PROFILER, schedule=None,
+                   **env_kwargs):
+    """Trains `agent` on `episodes` episodes spread over `num_workers` SUMO processes.
+
+    Yields (episode, histories, score) as episodes finish, like the serial loop in run_rl.py.
+    With a SnapshotPool the SUMO seeds (and so the warmup snapshots) are sampled from the pool.
+    """
+    ctx = mp.get_context("spawn")
+
+    shared_model = DQN(agent.state_size, agent.action_size)
+    shared_model.load_state_dict(agent.model.state_dict())
+    shared_model.share_memory()
+    shared_epsilon = ctx.Value('d', agent.epsilon, lock=False)
+    lock = ctx.Lock()
+
+    task_queue = ctx.Queue()
+    out_queue = ctx.Queue()
+    for e in range(start, episodes):
+        task_queue.put((e, pool.sample() if pool is not None else BASE_SEED + e))
+    for _ in range(num_workers):
+        task_queue.put(None)
+
+    workers = [ctx.Process(target=_worker_loop,
+                           args=(i, task_queue, out_queue, shared_model, shared_epsilon, lock, agent.gamma,
+                                 schedule, env_kwargs),
+                           daemon=True)
+               for i in range(num_workers)]
+    for w in workers:
+        w.start()
+
+    replays = 0
+    finished = 0
+    try:
+        while finished < episodes - start:
+            try:
+                kind, worker_id, payload = out_queue.get(timeout=WORKER_POLL_S)
+            except queue.Empty:
+                # A worker killed outright (e.g. SUMO crashing the process) never reports an error
+                dead = [i for i, w in enumerate(workers) if w.exitcode not in (None, 0)]
+                if dead:
+                    raise RuntimeError(f"Rollout worker {dead[0]} died (exit code {workers[dead[0]].exitcode})")
+                continue
+
+            if kind == "error":
+                raise RuntimeError(f"Rollout worker {worker_id} failed:\n{payload}")
+            if kind == "transitions":
+                for transition in payload:
+                    with profiler.span("replay"):
+                        agent.remember(*transition)
+                        agent.replay()
+                    replays += 1
+                    if replays % BROADCAST_EVERY == 0:
+                        with profiler.span("broadcast"), lock:
+                            shared_model.load_state_dict(agent.model.state_dict())
+            else:
+                finished += 1
+                agent.decay_epsilon()
+                with lock:
+                    shared_model.load_state_dict(agent.model.state_dict())
+                    shared_epsilon.value = agent.epsilon
+                yield payload
+    finally:
+        for w in workers:
+            w.join(timeout=1)
+            if w.is_alive():
+                w.terminate()
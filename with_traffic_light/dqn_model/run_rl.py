@@ -1,193 +1,280 @@
 import torch
-import traci
 import sys
 import os
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
 from tqdm import tqdm
 
 
 # Path setup
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dqn_model.dqn_agent import Agent
-from dqn_model.live_plot import init_plot, update_live_plot
-
-# Constants
-SUMO_PATH = os.path.join("sumo_network", "data", "simulation.sumocfg")
-
-# ALPHA and BETA were discovered using the calibrate.py file
-ALPHA = 5601.0
-BETA = 4238.26
-
-CONTROL_INTERVAL = 15
-MAX_STEPS = 3600
-MAX_SPEED, MAX_OCC, MAX_QUEUE, MAX_FLOW = 30.0, 100.0, 20.0, 2000.0
-TL_ID = "1494194482"
+from dqn_model.live_plot import Dashboard, MODES as PLOT_MODES
+from dqn_model.env import RampMeteringEnv, VectorEnv, SUMO_PATH, CONTROL_INTERVAL, STATE_SIZE, ACTION_SIZE
+from dqn_model.sim_backend import BACKENDS, set_backend
+from dqn_model.checkpoint import save_checkpoint, load_checkpoint
+from dqn_model.snapshots import SnapshotPool, WARMUP_STEPS
+from dqn_model.profiler import Profiler, NULL_PROFILER, format_summary
+from dqn_model.scheduler import SCHEDULES, FixedSchedule, ActionRepeat
 
 # Hyperparameters
 EPISODES = 50
+DOUBLE_TARGET_UPDATE = 1000  # Target-network copy interval that --double turns on by default (as train_offline.py)
 BATCH_SIZE = 32
+BASE_SEED = 42
+CHECKPOINT_DIR = "checkpoints"
 
-def get_detector_data(detector_prefix, num_lanes):
-    speeds, occs, flows = [], [], []
-    for i in range(num_lanes):
-        det_id = f"{detector_prefix}_{i}"
-        speeds.append(traci.inductionloop.getLastStepMeanSpeed(det_id))
-        occs.append(traci.inductionloop.getLastStepOccupancy(det_id))
-        # Flow = Vehicle count in the last step
-        flows.append(traci.inductionloop.getLastStepVehicleNumber(det_id))
-
-    # Normalize: Flow is usually 0, 1, or 2 vehicles per step.
-    avg_flow = np.sum(flows) * 3600 / num_lanes
-
-    return np.mean(speeds), np.mean(occs), avg_flow
-
-def run_simulation(agent):
-    traci.start(["sumo", "-c", SUMO_PATH, "--no-warnings", "--no-step-log"])
-
-    step = 0
-    total_score = 0
-    cumulative_veh = 0
-    prev_state, prev_action = None, 0
-    action = 0
-
-    histories = {
+def new_histories():
+    return {
         'speed15m': [], 'speed225m': [], 'speed475m': [],
         'occ15m': [], 'occ225m': [], 'occ475m': [],
         'flow15m': [], 'flow225m': [], 'flow475m': [],
         'queue': [], 'reward': []
     }
-    buffer = {k: [] for k in histories.keys() if k != 'reward'}
-
-    for step in tqdm(range(MAX_STEPS), desc=f"Ep /", leave=False):
-        # 1. Collect Data
-        s15, o15, f15 = get_detector_data("det_loc1", 5)
-        s225, o225, f225 = get_detector_data("det_loc2", 4)
-        s475, o475, f475 = get_detector_data("det_loc3", 4)
-        current_q = (traci.lane.getLastStepHaltingNumber("edge_ramp_0") +
-                     traci.lane.getLastStepHaltingNumber("edge_ramp_1")) / 2
-
-        buffer['speed15m'].append(s15); buffer['occ15m'].append(o15); buffer['flow15m'].append(f15)
-        buffer['speed225m'].append(s225); buffer['occ225m'].append(o225); buffer['flow225m'].append(f225)
-        buffer['speed475m'].append(s475); buffer['occ475m'].append(o475); buffer['flow475m'].append(f475)
-        buffer['queue'].append(current_q)
-
-        # 3. Agent Control (Every 30s)
-        if step % CONTROL_INTERVAL == 0 and step > 0:
-            avg_vals = {k: np.mean(v) for k, v in buffer.items()}
-            for k in buffer:
-                histories[k].append(avg_vals[k])
-
-            state = [
-                avg_vals['speed15m'] / MAX_SPEED,
-                avg_vals['occ15m'] / MAX_OCC,
-                avg_vals['speed225m'] / MAX_SPEED,
-                avg_vals['occ225m'] / MAX_OCC,
-                avg_vals['speed475m'] / MAX_SPEED,
-                avg_vals['occ475m'] / MAX_OCC,
-                avg_vals['flow15m'] / MAX_FLOW, # Normalize flow (approx max 2000)
-                avg_vals['flow225m'] / MAX_FLOW,
-                avg_vals['flow475m'] / MAX_FLOW,
-                avg_vals['queue'] / MAX_QUEUE
-            ]
-
-
-            current_tts = cumulative_veh
-            reward = (ALPHA - current_tts) / BETA
-            reward = np.clip(reward, -1.0, 1.0)
-            total_score += reward
-            histories['reward'].append(total_score)
-
-            if prev_state is not None:
-                agent.remember(prev_state, prev_action, reward, state, False)
-                agent.replay()
-
-            action = agent.act(state)
-
-            prev_state, prev_action = state, action
-            cumulative_veh = 0
-            for k in buffer: buffer[k] = []
-
-        if action == 0:
-            # FREE FLOW
-            traci.trafficlight.setPhase(TL_ID, 0) # Green
-        else:
-            # METERING (The "Smart Red")
-            # E.g., 2 seconds Green, 4 seconds Red cycle
-            cycle_position = step % 6
-            if cycle_position < 2:
-                traci.trafficlight.setPhase(TL_ID, 0) # Green (Release 1 car)
-            else:
-                traci.trafficlight.setPhase(TL_ID, 2) # Red (Hold back)
-
 
-        cumulative_veh += traci.simulation.getMinExpectedNumber()
-        traci.simulationStep()
+def record(histories, info, total_score):
+    for k, v in info['averages'].items():
+        histories[k].append(v)
+    histories['reward'].append(total_score)
+
+def run_simulation(agent, label="default", seed=None, progress=True, profiler=NULL_PROFILER, schedule=None,
+                   **env_kwargs):
+    # env_kwargs: extra RampMeteringEnv options (warmup_steps, trace_dir, ...)
+    # schedule: how many control intervals each action is held (default: query the agent every interval)
+    schedule = schedule or FixedSchedule()
+    env = RampMeteringEnv(label=label, seed=seed, profiler=profiler, **env_kwargs)
+    histories = new_histories()
+
+    state, info = env.reset()
+    total_score = info['reward']
+    record(histories, info, total_score)
+
+    held = ActionRepeat(agent.gamma)
+    with profiler.span("act"):
+        held.start(state, agent.act(state), schedule(state))
+
+    with tqdm(total=(env.max_steps - env.warmup_steps) // env.control_interval, desc=f"Ep /", leave=False, disable=not progress) as pbar:
+        truncated = False
+        while not truncated:
+            # Simulate one CONTROL_INTERVAL with the held action
+            next_state, reward, terminated, truncated, info = env.step(held.action)
 
-    traci.close()
-
-    master_agent.decay_epsilon()
-
-    return histories, total_score
+            total_score += reward
+            record(histories, info, total_score)
 
-def plot_results(h):
-    fig, axs = plt.subplots(2, 2, figsize=(16, 10))
-    ctrl_time = np.arange(len(h['queue'])) * CONTROL_INTERVAL
-    rew_time = np.arange(len(h['reward'])) * CONTROL_INTERVAL
+            # Agent Control (once the action has been held for its scheduled intervals)
+            if held.add(reward) or terminated or truncated:
+                with profiler.span("replay"):
+                    agent.remember(*held.transition(next_state, terminated))
+                    agent.replay()
+                if not truncated:
+                    with profiler.span("act"):
+                        held.start(next_state, agent.act(next_state), schedule(next_state))
 
-    # Speed
-    for loc in ['15m', '225m', '475m']:
-        axs[0, 0].plot(ctrl_time, h[f'speed{loc}'], label=loc)
-    axs[0, 0].set_title("Speed (m/s)"); axs[0, 0].legend()
+            pbar.update(1)
 
-    # Occupancy
-    for loc in ['15m', '225m', '475m']:
-        axs[0, 1].plot(ctrl_time, h[f'occ{loc}'], label=loc)
-    axs[0, 1].set_title("Occupancy (%)"); axs[0, 1].legend()
+    env.close()
 
-    # Queue
-    axs[1, 0].plot(ctrl_time, h['queue'], color='tab:red')
-    axs[1, 0].set_title("Queue Length"); axs[1, 0].set_xlabel("Time (s)")
+    agent.decay_epsilon()
 
-    # Cumulative Reward
-    axs[1, 1].plot(rew_time, h['reward'], color='tab:green', linewidth=2)
-    axs[1, 1].set_title("Cumulative Reward"); axs[1, 1].set_xlabel("Time (s)")
-    axs[1, 1].axhline(0, color='black', linestyle='--', linewidth=1, alpha=0.7)
+    return histories, total_score
 
-    plt.tight_layout()
-    plt.show()
+def train_vectorized(agent, episodes, num_envs, start=0, pool=None, profiler=NULL_PROFILER, schedule=None,
+                     **env_kwargs):
+    # num_envs simulations stepped in lockstep, one batched forward pass per decision
+    # (with a schedule, only the environments whose action has expired are queried)
+    schedule = schedule or FixedSchedule()
+    vec_env = VectorEnv(num_envs, **env_kwargs)
+    try:
+        for first in range(start, episodes, num_envs):
+            batch = min(num_envs, episodes - first)
+            if pool is not None:
+                seeds = [pool.sample() for _ in range(num_envs)]
+            else:
+                seeds = [BASE_SEED + first + i for i in range(num_envs)]
+            histories = [new_histories() for _ in range(num_envs)]
+
+            with profiler.span("env_reset"):
+                states, infos = vec_env.reset(seeds)
+            scores = np.array([info['reward'] for info in infos])
+            for h, info, score in zip(histories, infos, scores):
+                record(h, info, score)
+
+            held = [ActionRepeat(agent.gamma) for _ in range(num_envs)]
+            with profiler.span("act"):
+                for i, action in enumerate(agent.act_batch(states)):
+                    held[i].start(states[i], action, schedule(states[i]))
+
+            truncated = np.zeros(num_envs, dtype=bool)
+            while not truncated.any():
+                # The simulations run in the worker processes: this is the wait for the slowest one
+                with profiler.span("env_step"):
+                    next_states, rewards, terminated, truncated, infos = vec_env.step([h.action for h in held])
+
+                scores += rewards
+                due = []
+                for i in range(num_envs):
+                    expired = held[i].add(rewards[i]) or terminated[i] or truncated[i]
+                    # Environments past the last episode only keep the lockstep going
+                    if i < batch:
+                        record(histories[i], infos[i], scores[i])
+                        if expired:
+                            with profiler.span("replay"):
+                                agent.remember(*held[i].transition(next_states[i], terminated[i]))
+                                agent.replay()
+                    if expired:
+                        due.append(i)
+
+                if due and not truncated.any():
+                    with profiler.span("act"):
+                        for i, action in zip(due, agent.act_batch(next_states[due])):
+                            held[i].start(next_states[i], action, schedule(next_states[i]))
+
+            for i in range(batch):
+                agent.decay_epsilon()
+                yield first + i, histories[i], scores[i]
+    finally:
+        vec_env.close()
+
+def train_serial(agent, episodes, start=0, pool=None, profiler=NULL_PROFILER, schedule=None, **env_kwargs):
+    # One SUMO instance, episodes run back to back
+    for e in range(start, episodes):
+        seed = pool.sample() if pool is not None else None
+        histories, score = run_simulation(agent, seed=seed, profiler=profiler, schedule=schedule, **env_kwargs)
+        yield e, histories, score
 
 if __name__ == "__main__":
-    master_agent = Agent(state_size=10, action_size=2)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of parallel SUMO rollout workers (1 = serial training)")
+    parser.add_argument("--envs", type=int, default=1,
+                        help="Number of lockstep SUMO environments with batched inference (1 = serial training)")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="SUMO backend (default: $SUMO_BACKEND or traci)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the latest checkpoint in --checkpoint-dir")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--checkpoint-every", type=int, default=5,
+                        help="Write a full training checkpoint every N episodes, at the end of a batch with --envs (0 = never)")
+    parser.add_argument("--warmup", type=int, nargs="?", const=WARMUP_STEPS, default=0,
+                        help=f"Start episodes from a saved snapshot after this many warmup seconds "
+                             f"(default when given: {WARMUP_STEPS}; 0 = simulate the warmup)")
+    parser.add_argument("--snapshot-pool", type=int, default=0,
+                        help="Sample episodes from N pre-generated warmup snapshots (one per seed)")
+    parser.add_argument("--profile", metavar="PATH", default=None,
+                        help="Time the hot-path phases and write per-episode summaries to PATH (.json or .csv)")
+    parser.add_argument("--trace", metavar="DIR", default=None,
+                        help="Record every simulation step to binary traces in DIR (one file per SUMO instance)")
+    parser.add_argument("--target-update", type=int, default=0,
+                        help="Bootstrap from a target network copied from the online one every N replay steps")
+    parser.add_argument("--tau", type=float, default=None,
+                        help="Polyak-average the target network with this factor after every replay step")
+    parser.add_argument("--double", action="store_true",
+                        help="Double DQN targets (online network picks the next action, target network values it); "
+                             f"without --target-update / --tau the target is copied every {DOUBLE_TARGET_UPDATE} steps")
+    parser.add_argument("--plot", choices=PLOT_MODES, default=None,
+                        help="Dashboard: live window, PNG snapshots in --plot-dir, or none "
+                             "(default: window if a display is available, else png)")
+    parser.add_argument("--plot-dir", default="plots")
+    parser.add_argument("--plot-every", type=float, default=2.0, help="Minimum seconds between dashboard redraws")
+    parser.add_argument("--schedule", choices=sorted(SCHEDULES), default="fixed",
+                        help="When the agent is queried: every --repeat intervals (fixed), or every interval "
+                             "near congestion and every --repeat intervals in free flow (occupancy)")
+    parser.add_argument("--repeat", type=int, default=None,
+                        help="Control intervals an action is held for (default: 1 for fixed, 4 for occupancy)")
+    args = parser.parse_args()
+    if args.double and not (args.target_update or args.tau):
+        args.target_update = DOUBLE_TARGET_UPDATE
+    if args.backend:
+        set_backend(args.backend)
+    profiler = Profiler(args.profile) if args.profile else NULL_PROFILER
+    env_kwargs = {'warmup_steps': args.warmup, 'trace_dir': args.trace}
+    if args.schedule == "fixed":
+        schedule = FixedSchedule(args.repeat or 1)
+    else:
+        schedule = SCHEDULES[args.schedule](max_repeat=args.repeat or 4)
+
+    # Pre-generated warmup snapshots to sample the episodes from
+    pool = None
+    if args.warmup and args.snapshot_pool:
+        pool = SnapshotPool(["sumo", "-c", SUMO_PATH], range(BASE_SEED, BASE_SEED + args.snapshot_pool), args.warmup)
+        pool.generate(workers=max(args.workers, args.envs))
+
+    master_agent = Agent(state_size=STATE_SIZE, action_size=ACTION_SIZE,
+                         target_update=args.target_update, tau=args.tau, double=args.double)
     episode_scores = []
 
     # Track the best score (initialize with a very low number)
     best_score = -float('inf')
 
+    # Restore the full training state (weights, optimizer, epsilon, replay memory, RNGs)
+    start_episode = 0
+    if args.resume:
+        restored = load_checkpoint(master_agent, args.checkpoint_dir)
+        if restored is not None:
+            start_episode, training_state = restored
+            episode_scores = training_state['episode_scores']
+            best_score = training_state['best_score']
+            print(f"Resuming from episode {start_episode} (checkpoint in {args.checkpoint_dir})")
+
     # Ensure directory exists
     os.makedirs('models', exist_ok=True)
 
-    line, ax, fig = init_plot()
-
-    for e in tqdm(range(EPISODES), desc="Training Progress", unit="ep"):
-        histories, score = run_simulation(master_agent)
+    # Rendered in its own process: publishing never waits on matplotlib
+    dashboard = Dashboard(args.plot, args.plot_dir, args.plot_every)
+    for i, past_score in enumerate(episode_scores):
+        dashboard.publish(i + 1, past_score)
+
+    checkpoint_batch = 1  # Episodes that only form a consistent training state together
+    last_checkpoint = start_episode
+    if args.workers > 1:
+        from dqn_model.rollout import train_parallel
+        episode_results = train_parallel(master_agent, EPISODES, args.workers, start=start_episode,
+                                         pool=pool, profiler=profiler, schedule=schedule, **env_kwargs)
+    elif args.envs > 1:
+        checkpoint_batch = args.envs
+        episode_results = train_vectorized(master_agent, EPISODES, args.envs, start=start_episode,
+                                           pool=pool, profiler=profiler, schedule=schedule, **env_kwargs)
+    else:
+        episode_results = train_serial(master_agent, EPISODES, start=start_episode,
+                                       pool=pool, profiler=profiler, schedule=schedule, **env_kwargs)
+
+    for e, histories, score in tqdm(episode_results, initial=start_episode, total=EPISODES,
+                                    desc="Training Progress", unit="ep"):
         episode_scores.append(score)
 
-        update_live_plot(episode_scores, line, ax, fig)
+        with profiler.span("plot"):
+            dashboard.publish(len(episode_scores), score, histories, CONTROL_INTERVAL)
 
         # 1. Check if this is the best score so far
         if score > best_score:
             best_score = score
             save_path = os.path.join('models', 'best_model.pth')
-            torch.save(master_agent.model.state_dict(), save_path)
+            with profiler.span("checkpoint"):
+                torch.save(master_agent.model.state_dict(), save_path)
             tqdm.write(f"--> New Best Score: {score:.2f}! Model saved to {save_path}")
 
         # 2. Regular checkpoint (optional, every 10 eps)
         # if (e + 1) % 10 == 0:
         #     torch.save(master_agent.model.state_dict(), os.path.join('models', f"model_ep{e+1}.pth"))
 
+        # 3. Full training checkpoint (episodes can finish out of order with --workers, so count them).
+        # With --envs the replay memory and epsilon already hold the whole batch when its first
+        # episode is yielded, so the checkpoint waits for the end of the batch.
+        completed = len(episode_scores)
+        batch_done = (completed - start_episode) % checkpoint_batch == 0 or completed == EPISODES
+        if args.checkpoint_every and batch_done and \
+                (completed - last_checkpoint >= args.checkpoint_every or completed == EPISODES):
+            with profiler.span("checkpoint"):
+                save_checkpoint(master_agent, args.checkpoint_dir, completed,
+                                {'episode_scores': episode_scores, 'best_score': best_score})
+            last_checkpoint = completed
+
         print(f"\nEpisode {e+1}/{EPISODES} | Score: {score:.2f} | Epsilon: {master_agent.epsilon:.2f}\n")
 
-    plt.ioff()
-    plt.show()
-    plot_results(histories)
\ No newline at end of file
+        # 4. Timing breakdown of this episode (with --workers the simulation phases run in the workers)
+        summary = profiler.end_episode(e + 1, score=float(score))
+        if summary is not None:
+            tqdm.write(format_summary(summary))
+
+    dashboard.close()
\ No newline at end of file
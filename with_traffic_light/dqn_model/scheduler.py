@@ -0,0 +1,70 @@
+import numpy as np
+
+from dqn_model.env import STATE_KEYS, MAX_OCC, MAX_QUEUE
+
+# Control schedules: how many control intervals the policy's action is held (action repeat).
+# The environment still advances one CONTROL_INTERVAL per env.step(); a schedule decides, from
+# the state at a decision point, after how many of those intervals the policy is queried again.
+# The repeated intervals form one transition whose reward is their discounted sum and which
+# bootstraps gamma^k later (see ActionRepeat and Agent.learn). Fewer decisions in free flow mean
+# fewer forward passes and replay steps per episode.
+
+OCC_INDICES = [i for i, k in enumerate(STATE_KEYS) if k.startswith('occ')]
+QUEUE_INDEX = STATE_KEYS.index('queue')
+
+
+class FixedSchedule:
+    """Queries the policy every `repeat` control intervals (1 = the original behaviour)."""
+
+    def __init__(self, repeat=1):
+        self.repeat = repeat
+
+    def __call__(self, state):
+        return self.repeat
+
+
+class OccupancySchedule:
+    """Dense decisions near the bottleneck's critical occupancy, sparse ones in free flow.
+
+    Every interval while any detector location is above `free_occ` (%) or the ramp queue is
+    above `free_queue` (veh); otherwise the action is held for `max_repeat` intervals.
+    """
+
+    def __init__(self, free_occ=10.0, free_queue=2.0, max_repeat=4):
+        self.free_occ = free_occ
+        self.free_queue = free_queue
+        self.max_repeat = max_repeat
+
+    def __call__(self, state):
+        occupancy = np.max(state[OCC_INDICES]) * MAX_OCC
+        queue = state[QUEUE_INDEX] * MAX_QUEUE
+        if occupancy <= self.free_occ and queue <= self.free_queue:
+            return self.max_repeat
+        return 1
+
+
+SCHEDULES = {"fixed": FixedSchedule, "occupancy": OccupancySchedule}
+
+
+class ActionRepeat:
+    """Accumulates the intervals of one repeated action into a single transition."""
+
+    def __init__(self, gamma):
+        self.gamma = gamma
+        self.state = None
+
+    def start(self, state, action, repeat):
+        self.state, self.action, self.remaining = state, action, repeat
+        self.reward, self.discount, self.steps = 0.0, 1.0, 0
+
+    def add(self, reward):
+        """Adds one interval's reward. Returns True once the action has been held long enough."""
+        self.reward += self.discount * reward
+        self.discount *= self.gamma
+        self.steps += 1
+        self.remaining -= 1
+        return self.remaining <= 0
+
+    def transition(self, next_state, done):
+        # (state, action, discounted reward, next state, done, intervals) for Agent.remember
+        return self.state, self.action, self.reward, next_state, done, self.steps
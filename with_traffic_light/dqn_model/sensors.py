@@ -0,0 +1,49 @@
+import numpy as np
+import traci.constants as tc
+
+from dqn_model.detector_registry import load_layout
+
+DETECTOR_VARS = [tc.LAST_STEP_MEAN_SPEED, tc.LAST_STEP_OCCUPANCY, tc.LAST_STEP_VEHICLE_NUMBER]
+LANE_VARS = [tc.LAST_STEP_VEHICLE_HALTING_NUMBER]
+SIMULATION_VARS = [tc.VAR_MIN_EXPECTED_VEHICLES]
+
+
+# Sensor acquisition through TraCI subscriptions.
+# Everything is subscribed once after traci.start; SUMO then ships all values together with
+# the simulationStep response, so reading them costs no extra socket round-trips.
+class SensorReader:
+    def __init__(self, conn, layout=None):
+        self.conn = conn
+        # Detector and ramp lane IDs come from the registry (parsed once from the SUMO files)
+        self.layout = layout if layout is not None else load_layout()
+        self.detector_ids = self.layout.detector_ids
+        self.ramp_lanes = self.layout.ramp_lanes
+
+        for det_id in self.detector_ids:
+            conn.inductionloop.subscribe(det_id, DETECTOR_VARS)
+        for lane_id in self.ramp_lanes:
+            conn.lane.subscribe(lane_id, LANE_VARS)
+        conn.simulation.subscribe(SIMULATION_VARS)
+
+        # Latest readings, overwritten in place by update()
+        self.speeds = np.zeros(len(self.detector_ids))
+        self.occupancies = np.zeros(len(self.detector_ids))
+        self.counts = np.zeros(len(self.detector_ids))
+        self.halting = np.zeros(len(self.ramp_lanes))
+        self.min_expected = 0
+        self.update()
+
+    def update(self):
+        # Pulls the values delivered with the last simulation step (no TraCI round-trip)
+        det_results = self.conn.inductionloop.getAllSubscriptionResults()
+        for i, det_id in enumerate(self.detector_ids):
+            values = det_results[det_id]
+            self.speeds[i] = values[tc.LAST_STEP_MEAN_SPEED]
+            self.occupancies[i] = values[tc.LAST_STEP_OCCUPANCY]
+            self.counts[i] = values[tc.LAST_STEP_VEHICLE_NUMBER]
+
+        lane_results = self.conn.lane.getAllSubscriptionResults()
+        for i, lane_id in enumerate(self.ramp_lanes):
+            self.halting[i] = lane_results[lane_id][tc.LAST_STEP_VEHICLE_HALTING_NUMBER]
+
+        self.min_expected = self.conn.simulation.getSubscriptionResults()[tc.VAR_MIN_EXPECTED_VEHICLES]
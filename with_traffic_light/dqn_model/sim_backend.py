@@ -0,0 +1,71 @@
+import os
+import warnings
+import importlib.util
+
+# Simulation backend selection.
+# "traci"   - talks to a separate SUMO process over a TCP socket (required for sumo-gui)
+# "libsumo" - runs SUMO inside this Python process, no socket or serialization on each call
+# "replay"  - no SUMO at all: serves values recorded from a real run (replay_traci.py, for benchmarks)
+# All expose the same API, so callers only ever see the object returned by start().
+# Pick one with the SUMO_BACKEND environment variable (or set_backend / --backend).
+BACKENDS = ("traci", "libsumo", "replay")
+
+
+def get_backend():
+    return os.environ.get("SUMO_BACKEND", "traci").lower()
+
+
+def set_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SUMO backend '{name}', expected one of {BACKENDS}")
+    # Stored in the environment so spawned worker processes pick up the same choice
+    os.environ["SUMO_BACKEND"] = name
+
+
+_states_loaded = 0  # Saved states loaded into this process's libsumo
+
+
+def _state_backend(backend, gui):
+    # Runs from a saved state (warmup snapshots) are only reproducible as the first state loaded
+    # by a libsumo process: a separate sumo process (traci) and later loads into the same libsumo
+    # give a different run for the same seed. See snapshots.py.
+    global _states_loaded
+    if not gui and importlib.util.find_spec("libsumo") is not None:
+        if backend == "traci" and "SUMO_BACKEND" in os.environ:
+            warnings.warn("The traci backend was selected, but saved states (warmup snapshots) are "
+                          "loaded with libsumo: over traci, runs with the same seed are not "
+                          "reproducible. Other runs keep using traci.", RuntimeWarning)
+        backend = "libsumo"
+        _states_loaded += 1
+        if _states_loaded == 2:
+            warnings.warn("More than one saved state loaded in this process: runs from warmup snapshots "
+                          "are no longer reproducible for a given seed (only the first one is).",
+                          RuntimeWarning)
+    else:
+        warnings.warn("Starting from a saved state over traci: runs with the same seed will not be "
+                      "reproducible. Install libsumo (and don't use sumo-gui) for seeded runs from "
+                      "warmup snapshots.", RuntimeWarning)
+    return backend
+
+
+def start(sumo_cmd, label="default"):
+    """Starts SUMO with the selected backend and returns a TraCI-style connection."""
+    gui = os.path.basename(sumo_cmd[0]).startswith("sumo-gui")
+    backend = get_backend()
+
+    if backend == "replay":
+        from dqn_model.replay_traci import ReplayConnection
+        return ReplayConnection()
+
+    if "--load-state" in sumo_cmd and backend != "replay":
+        backend = _state_backend(backend, gui)
+
+    if backend == "libsumo" and not gui:
+        import libsumo
+        # In-process: one simulation per Python process, so the label is not needed
+        libsumo.start(sumo_cmd)
+        return libsumo
+
+    import traci
+    traci.start(sumo_cmd, label=label)
+    return traci.getConnection(label)
@@ -0,0 +1,99 @@
+import os
+import random
+import multiprocessing as mp
+
+from dqn_model.detector_registry import load_layout
+from dqn_model.result_cache import cache_key
+from dqn_model.sim_backend import start
+from dqn_model.metering import hold_green_for
+
+# Warmup snapshots.
+# The first WARMUP_STEPS seconds of every episode (main_warmup / ramp_warmup flows) are the same
+# free-flow traffic whatever the agent does. They are simulated once per seed with the ramp
+# meter held green, saved with simulation.saveState, and episodes then start from the saved
+# state. Snapshots are stored under the same content hash as the baseline cache, so editing the
+# network or the demand never reuses a stale state.
+#
+# The snapshot is loaded with SUMO's --load-state / --begin options rather than
+# simulation.loadState: loading through TraCI after start re-reads the route file, which
+# inserts the warmup flows a second time.
+#
+# Limitation: a loaded state does not replay reproducibly in SUMO. The same seed and actions
+# give the same run only for the first state loaded by a libsumo process; over traci (a separate
+# sumo process) and for later loads into the same libsumo, every run is different. So
+# sim_backend.start() loads snapshots with libsumo whatever the selected backend. It warns when
+# this overrides an explicitly selected traci backend, when it can't (libsumo not installed,
+# sumo-gui) and when a process loads a second snapshot. Seeded evaluation from snapshots runs
+# every episode in a fresh process (evaluate.py); training episodes from snapshots are not
+# exactly reproducible.
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR",
+                              os.path.join(os.path.expanduser("~"), ".cache", "ramp_metering", "snapshots"))
+WARMUP_STEPS = 600  # End of the warmup flows in traffic.rou.xml
+
+
+def snapshot_path(sumo_cmd, seed, warmup_steps, directory=SNAPSHOT_DIR):
+    key = cache_key(sumo_cmd, seed, hold_green=True)
+    return os.path.join(directory, f"{key}_t{warmup_steps}.xml.gz")
+
+
+def make_snapshot(sumo_cmd, seed, warmup_steps, directory=SNAPSHOT_DIR):
+    """Returns the snapshot of `sumo_cmd` after `warmup_steps` steps, simulating it if needed."""
+    path = snapshot_path(sumo_cmd, seed, warmup_steps, directory)
+    if os.path.exists(path):
+        return path
+    os.makedirs(directory, exist_ok=True)
+
+    cmd = ["sumo"] + list(sumo_cmd[1:]) + ["--save-state.rng"]
+    if seed is not None:
+        cmd += ["--seed", str(seed)]
+    sumocfg = sumo_cmd[sumo_cmd.index("-c") + 1]
+    tl_ids = [r.tl_id for r in load_layout(sumocfg).ramps if r.tl_id is not None]
+
+    conn = start(cmd, label=f"snapshot{os.getpid()}")
+    # Meters held green by SUMO itself, so the whole warmup is a single simulationStep call
+    delta_t = conn.simulation.getDeltaT()
+    for tl_id in tl_ids:
+        hold_green_for(conn, tl_id, (warmup_steps + 1) * delta_t)
+    conn.simulationStep(conn.simulation.getTime() + warmup_steps * delta_t)
+
+    # Written under a temporary name (SUMO picks the compression from the .gz suffix) so
+    # concurrent workers never load a half-written state
+    tmp_path = path[:-len(".xml.gz")] + f".{os.getpid()}.tmp.xml.gz"
+    conn.simulation.saveState(tmp_path)
+    conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_options(snapshot, warmup_steps):
+    # SUMO options that start the simulation from a snapshot
+    return ["--load-state", snapshot, "--begin", str(warmup_steps)]
+
+
+def _make_snapshot(job):
+    return make_snapshot(*job)
+
+
+# A fixed set of warmup snapshots (one per seed) that episodes are sampled from.
+class SnapshotPool:
+    def __init__(self, sumo_cmd, seeds, warmup_steps=WARMUP_STEPS, directory=SNAPSHOT_DIR):
+        self.sumo_cmd = list(sumo_cmd)
+        self.seeds = list(seeds)
+        self.warmup_steps = warmup_steps
+        self.directory = directory
+
+    def generate(self, workers=1):
+        # Simulates the snapshots that are not on disk yet
+        jobs = [(self.sumo_cmd, seed, self.warmup_steps, self.directory) for seed in self.seeds
+                if not os.path.exists(snapshot_path(self.sumo_cmd, seed, self.warmup_steps, self.directory))]
+        if workers > 1 and len(jobs) > 1:
+            with mp.get_context("spawn").Pool(workers) as pool:
+                pool.map(_make_snapshot, jobs)
+        else:
+            for job in jobs:
+                _make_snapshot(job)
+
+    def sample(self, rng=random):
+        """Returns the seed of a randomly chosen snapshot."""
+        return rng.choice(self.seeds)
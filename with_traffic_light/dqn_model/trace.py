@@ -0,0 +1,228 @@
+import os
+import json
+import numpy as np
+
+from dqn_model.calibration import load_calibration
+
+# Binary per-step traces of simulation runs, for offline RL.
+# A trace file is a JSON header (padded to HEADER_SIZE bytes) followed by fixed-width records,
+# one per simulation step, appended as the simulation runs. Several episodes can be appended to
+# the same file. The reader memory-maps the records and rebuilds transitions for any control
+# interval, state definition or reward without re-running SUMO.
+#
+# Record t of an episode holds the readings at simulation step t (row 0 = before the first
+# step), the vehicles in the network + backlog at that point (the TTS counted for step t), and
+# the action / light phase applied during step t. The episode's last record has the final
+# readings and action = phase = -1.
+#
+# The header meta records the run settings, including the reward calibration (alpha, beta) the
+# environment used, so offline rewards match the ones the agent saw online.
+
+MAGIC = "ramp-metering-trace"
+VERSION = 1
+HEADER_SIZE = 4096
+WRITE_BATCH = 256  # Records buffered before each write
+CONTROL_INTERVAL = 15
+
+
+def record_dtype(num_detectors, num_lanes):
+    return np.dtype([
+        ("episode", np.int32),
+        ("step", np.int32),
+        ("action", np.int8),
+        ("phase", np.int8),
+        ("min_expected", np.int32),
+        ("speeds", np.float32, (num_detectors,)),
+        ("occupancies", np.float32, (num_detectors,)),
+        ("counts", np.int16, (num_detectors,)),
+        ("halting", np.int16, (num_lanes,)),
+    ])
+
+
+def _read_header(fh):
+    header = json.loads(fh.read(HEADER_SIZE).rstrip(b"\0 ").decode())
+    if header.get("magic") != MAGIC:
+        raise ValueError(f"{fh.name} is not a trace file")
+    if header["version"] != VERSION:
+        raise ValueError(f"Unsupported trace version {header['version']} in {fh.name}")
+    return header
+
+
+class TraceWriter:
+    def __init__(self, path, layout, **meta):
+        self.path = path
+        self.dtype = record_dtype(len(layout.detector_ids), len(layout.ramp_lanes))
+        self.buffer = np.zeros(WRITE_BATCH, dtype=self.dtype)
+        self.pending = 0
+
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            # Append to an existing trace of the same layout, continuing its episode numbering
+            with open(path, "rb") as fh:
+                header = _read_header(fh)
+            if header["detector_ids"] != layout.detector_ids or header["ramp_lanes"] != layout.ramp_lanes:
+                raise ValueError(f"{path} was recorded with a different detector layout")
+            # Drop a partially written trailing record (e.g. after a crash)
+            num_records = (os.path.getsize(path) - HEADER_SIZE) // self.dtype.itemsize
+            self.fh = open(path, "r+b")
+            self.fh.truncate(HEADER_SIZE + num_records * self.dtype.itemsize)
+            self.fh.seek(0, os.SEEK_END)
+            self.episode = -1
+            if num_records:
+                last = np.memmap(path, dtype=self.dtype, mode="r", offset=HEADER_SIZE, shape=(num_records,))
+                self.episode = int(last[-1]["episode"])
+                del last
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            header = dict(magic=MAGIC, version=VERSION, detector_ids=layout.detector_ids,
+                          ramp_lanes=layout.ramp_lanes, group_sizes=layout.group_sizes, meta=meta)
+            raw = json.dumps(header).encode()
+            if len(raw) > HEADER_SIZE:
+                raise ValueError("Trace header too large")
+            self.fh = open(path, "wb")
+            self.fh.write(raw.ljust(HEADER_SIZE, b" "))
+            self.episode = -1
+
+    def begin_episode(self):
+        self.episode += 1
+
+    def append(self, step, action, phase, min_expected, sensors):
+        record = self.buffer[self.pending]
+        record["episode"] = self.episode
+        record["step"] = step
+        record["action"] = action
+        record["phase"] = phase
+        record["min_expected"] = min_expected
+        record["speeds"] = sensors.speeds
+        record["occupancies"] = sensors.occupancies
+        record["counts"] = sensors.counts
+        record["halting"] = sensors.halting
+        self.pending += 1
+        if self.pending == WRITE_BATCH:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.fh.write(self.buffer[:self.pending].tobytes())
+            self.fh.flush()
+            self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.fh.close()
+
+
+def default_states(means):
+    # Same normalised state vector RampMeteringEnv produces, one row per interval
+    # (env imports this module, so it is imported here)
+    from dqn_model.env import averages_from, build_state
+    return np.stack([build_state(averages_from(m)) for m in means])
+
+
+def default_rewards(tts, alpha=None, beta=None):
+    from dqn_model.env import compute_reward, ALPHA, BETA
+    alpha = ALPHA if alpha is None else alpha
+    beta = BETA if beta is None else beta
+    return np.array([compute_reward(t, alpha, beta) for t in tts], dtype=np.float32)
+
+
+class TraceReader:
+    def __init__(self, path):
+        with open(path, "rb") as fh:
+            header = _read_header(fh)
+        self.detector_ids = header["detector_ids"]
+        self.ramp_lanes = header["ramp_lanes"]
+        self.group_sizes = header["group_sizes"]
+        self.meta = header["meta"]
+
+        dtype = record_dtype(len(self.detector_ids), len(self.ramp_lanes))
+        num_records = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+        self.records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(num_records,)) \
+            if num_records else np.zeros(0, dtype=dtype)
+
+        # Group membership matrix (same grouping as DetectorAggregator)
+        self.membership = np.zeros((len(self.group_sizes), len(self.detector_ids)), dtype=np.float32)
+        start = 0
+        for g, size in enumerate(self.group_sizes):
+            self.membership[g, start:start + size] = 1.0
+            start += size
+
+    def __len__(self):
+        return len(self.records)
+
+    def episodes(self):
+        """Record views of the complete episodes in the file (ending with their final record)."""
+        ep = self.records["episode"]
+        bounds = np.flatnonzero(np.diff(ep)) + 1
+        episodes = np.split(self.records, bounds) if len(ep) else []
+        return [e for e in episodes if e["action"][-1] == -1]
+
+    def interval_means(self, records, control_interval=CONTROL_INTERVAL):
+        """Interval averages [speed_g..., occ_g..., flow_g..., queue] of one episode, as RampMeteringEnv computes them."""
+        num_intervals = (len(records) - 1) // control_interval
+        rows = records[:num_intervals * control_interval + 1]
+        G = len(self.group_sizes)
+        lane_counts = self.membership.sum(axis=1)
+
+        # Per-step channel sums and sample counts (-1 "no vehicle" speeds are left out)
+        speeds = rows["speeds"]
+        valid = (speeds != -1).astype(np.float32)
+        sums = np.empty((len(rows), 3 * G + 1))
+        counts = np.empty((len(rows), 3 * G + 1))
+        sums[:, :G] = (speeds * valid) @ self.membership.T
+        counts[:, :G] = valid @ self.membership.T
+        sums[:, G:2 * G] = rows["occupancies"] @ self.membership.T
+        counts[:, G:2 * G] = lane_counts
+        sums[:, 2 * G:3 * G] = rows["counts"] @ self.membership.T
+        counts[:, 2 * G:3 * G] = lane_counts
+        sums[:, 3 * G] = rows["halting"].sum(axis=1)
+        counts[:, 3 * G] = rows["halting"].shape[1]
+
+        # The first interval also holds the readings before the first step (as in env.reset)
+        starts = np.r_[0, np.arange(1, num_intervals) * control_interval + 1]
+        window_sums = np.add.reduceat(sums, starts, axis=0)
+        window_counts = np.add.reduceat(counts, starts, axis=0)
+        means = np.divide(window_sums, window_counts, out=np.zeros_like(window_sums), where=window_counts > 0)
+        means[:, 2 * G:3 * G] *= 3600.0
+        return means
+
+    def interval_tts(self, records, control_interval=CONTROL_INTERVAL):
+        num_intervals = (len(records) - 1) // control_interval
+        tts = records["min_expected"][:num_intervals * control_interval]
+        return tts.reshape(num_intervals, control_interval).sum(axis=1, dtype=np.int64)
+
+    def calibration(self, control_interval=CONTROL_INTERVAL):
+        """(alpha, beta) of the reward at `control_interval`, (None, None) for the defaults.
+
+        The values the recording env used when the interval is the recorded one, otherwise the
+        calibration table entry of the recorded network / demand.
+        """
+        meta = self.meta
+        if control_interval == meta.get("control_interval") and "alpha" in meta:
+            return meta["alpha"], meta["beta"]
+        if "sumo_path" not in meta:
+            return None, None
+        from dqn_model.env import MAX_STEPS
+        calibration = load_calibration(meta["sumo_path"], meta.get("demand_scale", 1.0), control_interval,
+                                       meta.get("max_steps", MAX_STEPS))
+        return calibration if calibration is not None else (None, None)
+
+    def transitions(self, control_interval=CONTROL_INTERVAL, state_fn=default_states, reward_fn=None):
+        """Rebuilds (states, actions, rewards, next_states, dones) from every episode in the trace.
+
+        The action of a transition is the one applied at the start of its interval, so traces can
+        be re-cut at another control interval than the one they were recorded with. Without a
+        reward_fn the rewards use the trace's calibration (see calibration()).
+        """
+        if reward_fn is None:
+            alpha, beta = self.calibration(control_interval)
+            reward_fn = lambda tts: default_rewards(tts, alpha, beta)
+        parts = []
+        for records in self.episodes():
+            states = state_fn(self.interval_means(records, control_interval))
+            rewards = reward_fn(self.interval_tts(records, control_interval))
+            actions = records["action"][control_interval:len(states) * control_interval:control_interval]
+            parts.append((states[:-1], actions.astype(np.int64), rewards[1:], states[1:],
+                          np.zeros(len(states) - 1, dtype=np.float32)))
+        if not parts:
+            raise ValueError("Trace contains no complete episode")
+        return tuple(np.concatenate(p) for p in zip(*parts))
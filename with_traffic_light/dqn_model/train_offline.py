@@ -0,0 +1,153 @@
+import os
+import sys
+import glob
+import argparse
+import random
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+from tqdm import tqdm
+
+# Path setup
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn_model.dqn_agent import Agent
+from dqn_model.env import STATE_SIZE, ACTION_SIZE, CONTROL_INTERVAL
+from dqn_model.trace import TraceReader
+
+# Offline (batch) training of the DQN on recorded transitions, without SUMO.
+# Transitions are rebuilt from trace files (run_rl.py --trace) and loaded into the agent's
+# replay store in one bulk insert. A fixed number of large-batch gradient steps is then run,
+# with the minibatches gathered by DataLoader worker processes so the learner never waits on
+# sampling. The same traces can be reused for any number of hyperparameter trials.
+#
+# Usage: python dqn_model/train_offline.py traces/ --steps 20000 --batch-size 1024 --workers 2
+
+OUT_PATH = os.path.join("models", "offline_model.pth")
+
+
+def trace_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "*.trace")))
+        else:
+            files.append(path)
+    return files
+
+
+def load_transitions(paths, control_interval=CONTROL_INTERVAL):
+    """(states, actions, rewards, next_states, dones) of every complete episode in the trace files."""
+    parts = [TraceReader(f).transitions(control_interval) for f in trace_files(paths)]
+    if not parts:
+        raise ValueError(f"No trace files found in {paths}")
+    return tuple(np.concatenate(p) for p in zip(*parts))
+
+
+# Endless stream of uniformly sampled minibatches, split over the DataLoader workers.
+# The tensors wrap the replay store's arrays, which the forked workers share with the learner.
+class TransitionBatches(IterableDataset):
+    def __init__(self, tensors, batch_size, num_batches):
+        self.tensors = tensors
+        self.batch_size = batch_size
+        self.num_batches = num_batches
+
+    def __iter__(self):
+        worker = get_worker_info()
+        count = self.num_batches
+        if worker is not None:
+            count = count // worker.num_workers + (worker.id < count % worker.num_workers)
+        size = len(self.tensors[0])
+        for _ in range(count):
+            indices = torch.randint(size, (self.batch_size,))
+            yield tuple(t[indices] for t in self.tensors)
+
+
+def uniform_batches(agent, batch_size, num_batches, num_workers):
+    memory = agent.memory
+    tensors = tuple(torch.from_numpy(getattr(memory, name)[:len(memory)]) for name in memory.FIELDS)
+    dataset = TransitionBatches(tensors, batch_size, num_batches)
+    return DataLoader(dataset, batch_size=None, num_workers=num_workers,
+                      prefetch_factor=4 if num_workers else None)
+
+
+def prioritized_batches(agent, batch_size, num_batches):
+    # Priorities change after every step, so prioritized batches are drawn in the learner process
+    for _ in range(num_batches):
+        yield agent.memory.sample(batch_size)
+
+
+def train_offline(agent, num_steps, batch_size, num_workers=2, log_every=500):
+    """Runs `num_steps` gradient steps on the agent's replay store. Returns the mean loss of each log window."""
+    if agent.prioritized:
+        batches = prioritized_batches(agent, batch_size, num_steps)
+    else:
+        batches = uniform_batches(agent, batch_size, num_steps, num_workers)
+
+    losses, window = [], []
+    for step, batch in enumerate(tqdm(batches, total=num_steps, desc="Gradient steps"), 1):
+        if agent.prioritized:
+            *batch, indices, weights = batch
+            td_errors = agent.learn(*batch, weights=weights)
+            agent.memory.update_priorities(indices, td_errors.abs().numpy())
+        else:
+            td_errors = agent.learn(*batch)
+        window.append(td_errors.pow(2).mean().item())
+
+        if step % log_every == 0 or step == num_steps:
+            losses.append(float(np.mean(window)))
+            tqdm.write(f"Step {step}/{num_steps} | Loss: {losses[-1]:.5f}")
+            window = []
+    return losses
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the DQN offline on recorded traces")
+    parser.add_argument("traces", nargs="+", help="Trace files or directories of .trace files")
+    parser.add_argument("--steps", type=int, default=10000, help="Number of gradient steps")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--workers", type=int, default=2, help="DataLoader worker processes (0 = sample in-process)")
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--gamma", type=float, default=0.99)
+    parser.add_argument("--interval", type=int, default=CONTROL_INTERVAL,
+                        help="Control interval the transitions are rebuilt with")
+    parser.add_argument("--prioritized", action="store_true", help="Prioritized replay (sampled in-process)")
+    parser.add_argument("--target-update", type=int, default=1000,
+                        help="Copy the online weights into the target network every N gradient steps")
+    parser.add_argument("--tau", type=float, default=None,
+                        help="Polyak-average the target network with this factor every step instead")
+    parser.add_argument("--double", action="store_true", help="Double DQN targets")
+    parser.add_argument("--init", default=None, help="Start from these model weights instead of a fresh network")
+    parser.add_argument("--out", default=OUT_PATH)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads for the learner")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    # 1. Load every recorded transition into the replay store
+    transitions = load_transitions(args.traces, args.interval)
+    print(f"Loaded {len(transitions[1])} transitions from {len(trace_files(args.traces))} trace files")
+
+    agent = Agent(STATE_SIZE, ACTION_SIZE, memory_size=len(transitions[1]), prioritized=args.prioritized,
+                  target_update=args.target_update, tau=args.tau, double=args.double)
+    agent.memory.extend(*transitions)
+    agent.gamma = args.gamma
+    agent.batch_size = args.batch_size
+    agent.learning_rate = args.lr
+    for group in agent.optimizer.param_groups:
+        group['lr'] = args.lr
+    if args.init:
+        agent.model.load_state_dict(torch.load(args.init))
+        agent.update_target()
+
+    # 2. Fixed number of gradient steps
+    train_offline(agent, args.steps, args.batch_size, args.workers)
+
+    # 3. Save the weights (same format as best_model.pth)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    torch.save(agent.model.state_dict(), args.out)
+    print(f"Model saved to {args.out}")
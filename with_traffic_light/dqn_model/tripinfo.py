@@ -0,0 +1,117 @@
+import os
+import sys
+import numpy as np
+import xml.etree.ElementTree as ET
+from array import array
+
+# Tripinfo ingestion and columnar metrics.
+# SUMO's tripinfo-output is streamed with iterparse (each <tripinfo> element is discarded as soon
+# as its attributes are read, so memory does not grow with the XML size) into one compact .npz
+# per run. Metrics are then computed with vectorised NumPy operations on the columns.
+
+FLOAT_COLUMNS = ["depart", "arrival", "duration", "waitingTime", "timeLoss", "departDelay", "routeLength"]
+RAMP_VTYPE = "car_ramp"  # Vehicle type of the on-ramp flows in traffic.rou.xml
+
+
+def ingest_tripinfo(xml_path, out_path=None):
+    """Parses a tripinfo XML file into a columnar .npz and returns the TripMetrics."""
+    if out_path is None:
+        out_path = os.path.splitext(xml_path)[0] + ".npz"
+
+    columns = {c: array('d') for c in FLOAT_COLUMNS}
+    vtype_codes, flow_codes = array('H'), array('H')
+    vtypes, flows = {}, {}
+
+    context = ET.iterparse(xml_path, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event != "end" or elem.tag != "tripinfo":
+            continue
+        attrs = elem.attrib
+        for c in FLOAT_COLUMNS:
+            columns[c].append(float(attrs.get(c, "nan")))
+        # Categorical columns are stored as small integer codes
+        vtype_codes.append(vtypes.setdefault(attrs.get("vType", ""), len(vtypes)))
+        flow = attrs["id"].rsplit(".", 1)[0]  # main_peak.123 -> main_peak
+        flow_codes.append(flows.setdefault(flow, len(flows)))
+        elem.clear()
+        root.clear()
+
+    data = {c: np.frombuffer(columns[c], dtype=np.float64) for c in FLOAT_COLUMNS}
+    data["vtype"] = np.frombuffer(vtype_codes, dtype=np.uint16)
+    data["flow"] = np.frombuffer(flow_codes, dtype=np.uint16)
+    data["vtype_names"] = np.array(list(vtypes), dtype=str)
+    data["flow_names"] = np.array(list(flows), dtype=str)
+    np.savez_compressed(out_path, **data)
+    return TripMetrics(data)
+
+
+def load_metrics(path):
+    """Loads a run's TripMetrics, from the .npz if it is up to date, otherwise by ingesting the XML."""
+    if path.endswith(".npz"):
+        return TripMetrics.load(path)
+    npz_path = os.path.splitext(path)[0] + ".npz"
+    if os.path.exists(npz_path) and os.path.getmtime(npz_path) >= os.path.getmtime(path):
+        return TripMetrics.load(npz_path)
+    return ingest_tripinfo(path, npz_path)
+
+
+class TripMetrics:
+    def __init__(self, data):
+        self.data = data
+        self.vtype_names = [str(v) for v in data["vtype_names"]]
+        self.flow_names = [str(f) for f in data["flow_names"]]
+
+    @classmethod
+    def load(cls, npz_path):
+        with np.load(npz_path) as f:
+            return cls({k: f[k] for k in f.files})
+
+    def __len__(self):
+        return len(self.data["depart"])
+
+    def __getitem__(self, column):
+        return self.data[column]
+
+    def is_ramp(self):
+        if RAMP_VTYPE not in self.vtype_names:
+            return np.zeros(len(self), dtype=bool)
+        return self.data["vtype"] == self.vtype_names.index(RAMP_VTYPE)
+
+    def tts(self, mask=None):
+        # Total Time Spent (veh*s) of completed trips, including the time spent waiting to be inserted
+        time_spent = self.data["duration"] + self.data["departDelay"]
+        return float(time_spent.sum() if mask is None else time_spent[mask].sum())
+
+    def delay(self, mask=None):
+        time_loss = self.data["timeLoss"]
+        return float(time_loss.sum() if mask is None else time_loss[mask].sum())
+
+    def summary(self):
+        """Vehicle count, TTS, total and mean delay and waiting time, for all trips / mainline / ramp."""
+        ramp = self.is_ramp()
+        result = {}
+        for name, mask in (("all", np.ones(len(self), dtype=bool)), ("mainline", ~ramp), ("ramp", ramp)):
+            n = int(mask.sum())
+            result[name] = {
+                "vehicles": n,
+                "tts": self.tts(mask),
+                "delay": self.delay(mask),
+                "mean_delay": self.delay(mask) / n if n else 0.0,
+                "waiting": float(self.data["waitingTime"][mask].sum()),
+            }
+        return result
+
+    def by_flow(self, column="timeLoss"):
+        # Per-flow sums of one column (e.g. delay of main_warmup / main_peak / ramp_peak ...)
+        sums = np.bincount(self.data["flow"], weights=self.data[column], minlength=len(self.flow_names))
+        return dict(zip(self.flow_names, sums.tolist()))
+
+
+if __name__ == "__main__":
+    # Usage: python tripinfo.py run1/tripinfo.xml run2/tripinfo.xml ...
+    print(f"{'run':40s} {'veh':>6s} {'TTS (h)':>9s} {'delay (h)':>10s} {'ramp delay (h)':>15s} {'main delay (h)':>15s}")
+    for path in sys.argv[1:]:
+        s = load_metrics(path).summary()
+        print(f"{path:40s} {s['all']['vehicles']:6d} {s['all']['tts'] / 3600:9.1f} {s['all']['delay'] / 3600:10.1f} "
+              f"{s['ramp']['delay'] / 3600:15.1f} {s['mainline']['delay'] / 3600:15.1f}")
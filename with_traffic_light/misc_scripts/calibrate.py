@@ -1,8 +1,11 @@
 import os
-import traci
 import numpy as np
 import sys
 
+# Path setup
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn_model.result_cache import baseline_series, interval_tts
+
 # CONFIGURATION
 sumoBinary = "sumo" # Use command line for speed
 SUMO_PATH = os.path.join("sumo_network", "data", "simulation.sumocfg")
@@ -12,38 +15,13 @@ CONTROL_INTERVAL = 15
 MAX_STEPS = 3600
 
 def run_calibration():
-    # 1. Start Simulation
-    traci.start(sumoCmd)
-
-    step = 0
-    cumulative_veh = 0
-    tts_history = [] # Store TTS for every 30s interval
-
+    # 1. No-control run with the light held green (simulated once, then read from the baseline cache)
     print("Running Calibration (No Control)...")
+    series = baseline_series(sumoCmd, MAX_STEPS, hold_green=True)
 
-    while step < MAX_STEPS:
-        # A. Count vehicles (Road + Backlog)
-        # This represents the "Instantaneous TTS" for this second
-        n_vehicles = traci.simulation.getMinExpectedNumber()
-        cumulative_veh += n_vehicles
-
-        # B. End of Control Interval
-        if step % CONTROL_INTERVAL == 0 and step > 0:
-            # 1. Store the Total Time Spent for this specific 30s chunk
-            tts_history.append(cumulative_veh)
-
-            # 2. Reset counter
-            cumulative_veh = 0
-
-            # 3. Force Green Light (No Control Strategy)
-            # Replace "1494194482" with your actual Traffic Light ID
-            traci.trafficlight.setPhase("1494194482", 0)
-
-        # C. Step
-        traci.simulationStep()
-        step += 1
-
-    traci.close()
+    # Total Time Spent of every control interval:
+    # vehicles on the road + backlog ("Instantaneous TTS") summed over the interval's seconds
+    tts_history = interval_tts(series, CONTROL_INTERVAL)
 
     # 2. Calculate Alpha and Beta
     # Paper: "replace a and B with the maximum TTS and average TTS... respectively"
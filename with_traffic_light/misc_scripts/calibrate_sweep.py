@@ -0,0 +1,38 @@
+import os
+import sys
+import argparse
+
+# Path setup
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn_model.calibration import run_sweep, calibration_path
+from dqn_model.env import SUMO_PATH, CONTROL_INTERVAL, MAX_STEPS
+
+# Batch version of calibrate.py: runs the uncontrolled simulation for every seed x demand scaling
+# in a process pool and writes ALPHA / BETA (mean and 95% CI) to the calibration table that
+# RampMeteringEnv loads automatically.
+# Usage: python misc_scripts/calibrate_sweep.py --seeds 0 1 2 3 4 --scales 0.8 1.0 1.2
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate the TTS reward over seeds and demand scalings")
+    parser.add_argument("--seeds", type=int, nargs="+", default=list(range(5)))
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0],
+                        help="Demand scalings passed to SUMO's --scale")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of parallel SUMO processes (default: one per CPU)")
+    parser.add_argument("--config", default=SUMO_PATH)
+    parser.add_argument("--interval", type=int, default=CONTROL_INTERVAL)
+    parser.add_argument("--steps", type=int, default=MAX_STEPS)
+    args = parser.parse_args()
+
+    print(f"Calibrating {len(args.seeds)} seeds x {len(args.scales)} demand scalings...")
+    entries = run_sweep(args.config, args.seeds, args.scales, args.interval, args.steps, args.workers)
+
+    print("\n" + "="*60)
+    print("CALIBRATION RESULTS (mean [95% CI])")
+    print("="*60)
+    for key, entry in entries.items():
+        print(key)
+        print(f"  Alpha (Max TTS): {entry['alpha']:.1f} [{entry['alpha_ci'][0]:.1f}, {entry['alpha_ci'][1]:.1f}]")
+        print(f"  Beta (Avg TTS):  {entry['beta']:.1f} [{entry['beta_ci'][0]:.1f}, {entry['beta_ci'][1]:.1f}]")
+    print("="*60)
+    print(f"Written to {calibration_path(args.config)}")
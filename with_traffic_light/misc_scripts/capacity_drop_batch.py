@@ -0,0 +1,79 @@
+import os
+import sys
+import csv
+import argparse
+import multiprocessing as mp
+import numpy as np
+
+# Path setup
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn_model.capacity_drop import analyze, from_series, from_trace
+from dqn_model.calibration import mean_ci
+from dqn_model.detector_registry import load_layout
+from dqn_model.env import SUMO_PATH
+
+# Batch replication check of the capacity drop (paper Figure 6) over many no-control runs.
+# Each seed is simulated once with the light held green (later runs come from the baseline
+# cache) and analysed with dqn_model/capacity_drop.py: travel-time shifts between the detector
+# locations, congestion onset / end at the bottleneck, pre-queue capacity, discharge rate and
+# the relative drop. Recorded traces can be analysed instead of simulating.
+# Usage: python misc_scripts/capacity_drop_batch.py --seeds 100 --workers 4 --out capacity_drop.csv
+
+STEPS = 4200
+COLUMNS = ["onset", "end", "capacity", "discharge", "drop"]
+
+
+def _analysis_run(job):
+    # Imported here so each pool process sets up its own simulation backend
+    from dqn_model.result_cache import baseline_series
+
+    sumo_path, seed, steps = job
+    series = baseline_series(["sumo", "-c", sumo_path], steps, seed=seed, hold_green=True)
+    return dict(run=f"seed={seed}", **analyze(*from_series(series, load_layout(sumo_path))))
+
+
+def trace_rows(paths):
+    from dqn_model.trace import TraceReader
+    rows = []
+    for path in paths:
+        reader = TraceReader(path)
+        for i, records in enumerate(reader.episodes()):
+            rows.append(dict(run=f"{os.path.basename(path)}#{i}", **analyze(*from_trace(reader, records))))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capacity-drop analysis over many no-control runs")
+    parser.add_argument("--seeds", type=int, default=20, help="Number of simulated runs (seeds 0..N-1)")
+    parser.add_argument("--steps", type=int, default=STEPS)
+    parser.add_argument("--config", default=SUMO_PATH)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of parallel SUMO processes (default: one per CPU)")
+    parser.add_argument("--traces", nargs="+", default=None, help="Analyse the episodes of these trace files instead")
+    parser.add_argument("--out", default=None, help="Write one row per run to this CSV file")
+    args = parser.parse_args()
+
+    if args.traces:
+        rows = trace_rows(args.traces)
+    else:
+        jobs = [(args.config, seed, args.steps) for seed in range(args.seeds)]
+        with mp.get_context("spawn").Pool(args.workers) as pool:
+            rows = pool.map(_analysis_run, jobs)
+
+    shift_columns = sorted(k for k in rows[0] if k.startswith("shift_"))
+    congested = [r for r in rows if not np.isnan(r["onset"])]
+    print(f"{len(rows)} runs, {len(congested)} with a congested bottleneck (mean [95% CI])")
+    for column in shift_columns:
+        mean, (lo, hi) = mean_ci([r[column] for r in rows])
+        print(f"  {column + ' (s)':16s} {mean:9.1f} [{lo:.1f}, {hi:.1f}]")
+    for column in COLUMNS:
+        if congested:
+            mean, (lo, hi) = mean_ci([r[column] for r in congested])
+            print(f"  {column:16s} {mean:9.3f} [{lo:.3f}, {hi:.3f}]")
+
+    if args.out:
+        with open(args.out, "w", newline="") as fh:
+            writer = csv.DictWriter(fh, fieldnames=["run"] + shift_columns + COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Written to {args.out}")
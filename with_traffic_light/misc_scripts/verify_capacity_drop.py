@@ -1,85 +1,51 @@
+import sys
 import os
-import traci
 import matplotlib.pyplot as plt
 
+# Path setup
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn_model.detector_registry import load_layout
+from dqn_model.result_cache import baseline_series
+from dqn_model.capacity_drop import Q0, from_series, oblique_curves, travel_time_shifts, align, detect_capacity_drop
+
 # --- CONFIGURATION ---
 SUMO_PATH = os.path.join("sumo_network", "data", "simulation.sumocfg")
 SUMO_CMD = ["sumo", "-c", SUMO_PATH, "--start"]
 
-# Define the 3 detector groups
-DETECTORS_1 = ["det_loc1_0", "det_loc1_1", "det_loc1_2", "det_loc1_3", "det_loc1_4"]
-DETECTORS_2 = ["det_loc2_0", "det_loc2_1", "det_loc2_2", "det_loc2_3"]
-DETECTORS_3 = ["det_loc3_0", "det_loc3_1", "det_loc3_2", "det_loc3_3"]
-
-# Paper Constants
-Q0_HOUR = 8160.0
-STEP_LENGTH = 1 # Matches your sumocfg
-Q0_STEP = (Q0_HOUR / 3600.0) * STEP_LENGTH # Subtract per step, not per second
+# The 3 detector groups (from the detector registry)
+LAYOUT = load_layout(SUMO_PATH)
+MAX_STEPS = 4200
 
 def run_replication():
-    traci.start(SUMO_CMD)
-
-    # Cumulative counters
-    cum_1 = 0; cum_2 = 0; cum_3 = 0
-
-    # Lists to store N'(x,t)
-    n_prime_1 = []; n_prime_2 = []; n_prime_3 = []
-
-    step = 0
-    while step < 4200:
-        traci.simulationStep()
-
-        # 1. Sum counts for each location
-        c1 = sum(traci.inductionloop.getLastStepVehicleNumber(d) for d in DETECTORS_1)
-        c2 = sum(traci.inductionloop.getLastStepVehicleNumber(d) for d in DETECTORS_2)
-        c3 = sum(traci.inductionloop.getLastStepVehicleNumber(d) for d in DETECTORS_3)
+    # Run with the static light program, simulated once and then read from the baseline cache
+    series = baseline_series(SUMO_CMD, MAX_STEPS)
+    times, counts, occupancy = from_series(series, LAYOUT)
+    delta_t = times[1] - times[0]
 
-        # 2. Update cumulative totals
-        cum_1 += c1
-        cum_2 += c2
-        cum_3 += c3
+    # 1. Cumulative counts per location and 2. N'(x, t) = N(x, t) - q0 * t (q0 = 8160 veh/h)
+    curves = oblique_curves(times, counts, Q0)
 
-        # 3. Calculate N'(x, t) = N(x, t) - q0 * t
-        np1 = cum_1 - (Q0_STEP * step)
-        np2 = cum_2 - (Q0_STEP * step)
-        np3 = cum_3 - (Q0_STEP * step)
+    # 3. Travel time shifts (paper: "16s and 25s, respectively"), estimated by cross-correlation
+    shifts = travel_time_shifts(counts, delta_t)
+    print(f"Travel time shifts: +1225m {shifts[1]:.0f}s, +1475m {shifts[2]:.0f}s")
 
-        n_prime_1.append(np1)
-        n_prime_2.append(np2)
-        n_prime_3.append(np3)
+    # 4. Capacity drop onset and magnitude
+    drop = detect_capacity_drop(times, counts, occupancy, shifts=shifts)
+    if drop is not None:
+        print(f"Capacity drop: onset {drop['onset']:.0f}s, {drop['capacity']:.0f} -> {drop['discharge']:.0f} veh/h "
+              f"({100 * drop['drop']:.1f}%)")
 
-        step += 1
+    plot_figure_6(*align(times, curves, shifts, delta_t), shifts, drop)
 
-    traci.close()
-    plot_figure_6(n_prime_1, n_prime_2, n_prime_3)
-
-def plot_figure_6(data1, data2, data3):
+def plot_figure_6(t, curves, shifts, drop):
     plt.figure(figsize=(10, 6))
 
-    # Time axis
-    t = [i * STEP_LENGTH for i in range(len(data1))]
-
     # --- SHIFTING LOGIC ---
-    # The paper shifts downstream curves to the left by travel time.
-    # "16s and 25s, respectively"
-    # Shift 1 (+920m): 0s (Reference)
-    # Shift 2 (+1225m): -16s
-    # Shift 3 (+1475m): -25s
-
-    shift_2 = 16
-    shift_3 = 25
-
-    # Plotting
-    # We slice the arrays to align them visually
-    # Line 1 (Red in paper): +920m
-    plt.plot(t[:-shift_3], data1[:-shift_3], label='+920m', color='firebrick', linewidth=1.5)
-
-    # Line 2 (Orange in paper): +1225m (Shifted left by 16s)
-    # This means data2[16] aligns with data1[0]
-    plt.plot(t[:-shift_3], data2[shift_2:-(shift_3-shift_2)], label='+1225m', color='orange', linewidth=1.5, linestyle='--')
-
-    # Line 3 (Blue in paper): +1475m (Shifted left by 25s)
-    plt.plot(t[:-shift_3], data3[shift_3:], label='+1475m', color='steelblue', linewidth=1.5, linestyle='-.')
+    # The paper shifts downstream curves to the left by travel time, so every curve
+    # is on the clock of the +920m reference (already aligned by align())
+    plt.plot(t, curves[:, 0], label='+920m', color='firebrick', linewidth=1.5)
+    plt.plot(t, curves[:, 1], label=f'+1225m (-{shifts[1]:.0f}s)', color='orange', linewidth=1.5, linestyle='--')
+    plt.plot(t, curves[:, 2], label=f'+1475m (-{shifts[2]:.0f}s)', color='steelblue', linewidth=1.5, linestyle='-.')
 
     plt.title("Replication of Figure 6: Capacity Drop Analysis")
     plt.xlabel("Simulation Time (s)")
@@ -87,11 +53,12 @@ def plot_figure_6(data1, data2, data3):
     plt.legend()
     plt.grid(True)
 
-    # Congestion markers from paper (approximate)
-    plt.axvline(x=600, color='gray', linestyle=':', alpha=0.5)
-    plt.axvline(x=950, color='gray', linestyle=':', alpha=0.5)
+    # Detected congestion onset / end
+    if drop is not None:
+        plt.axvline(x=drop['onset'], color='gray', linestyle=':', alpha=0.5)
+        plt.axvline(x=drop['end'], color='gray', linestyle=':', alpha=0.5)
 
     plt.show()
 
 if __name__ == "__main__":
-    run_replication()
\ No newline at end of file
+    run_replication()
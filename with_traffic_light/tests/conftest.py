@@ -0,0 +1,13 @@
+import os
+import sys
+import pytest
+
+# Path setup
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+
+@pytest.fixture(autouse=True)
+def project_dir(monkeypatch):
+    # The SUMO paths (sumo_network/...) are relative to with_traffic_light/
+    monkeypatch.chdir(ROOT)
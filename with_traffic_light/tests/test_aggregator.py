@@ -0,0 +1,55 @@
+import numpy as np
+
+from dqn_model.aggregator import IntervalAggregator, DetectorAggregator
+
+
+def test_windows_emit_independently():
+    # Window 0 emitted every 2 samples, window 1 every 4, from the same pass
+    agg = IntervalAggregator(2, num_windows=2)
+    emitted = {0: [], 1: []}
+    for step in range(1, 9):
+        agg.add(np.array([step, 10.0 * step]), np.ones(2))
+        if step % 2 == 0:
+            emitted[0].append(agg.emit(0).copy())
+        if step % 4 == 0:
+            emitted[1].append(agg.emit(1).copy())
+    np.testing.assert_allclose(np.array(emitted[0])[:, 0], [1.5, 3.5, 5.5, 7.5])
+    np.testing.assert_allclose(np.array(emitted[1])[:, 0], [2.5, 6.5])
+    np.testing.assert_allclose(np.array(emitted[1])[:, 1], [25.0, 65.0])
+
+
+def test_emit_resets_only_its_window():
+    agg = IntervalAggregator(1, num_windows=2)
+    agg.add(np.array([4.0]), np.array([1.0]))
+    assert agg.emit(0)[0] == 4.0
+    # Nothing added since: an empty interval reports 0.0, the other window still has its sample
+    assert agg.emit(0)[0] == 0.0
+    assert agg.emit(1)[0] == 4.0
+
+
+def test_detector_interval_means():
+    # Two groups (2 + 1 detectors), two ramp lanes; -1 speeds are left out of the mean
+    agg = DetectorAggregator([2, 1])
+    agg.update(np.array([10.0, -1.0, -1.0]), np.array([5.0, 15.0, 0.0]), np.array([1, 0, 0]), np.array([2, 0]))
+    agg.update(np.array([20.0, 30.0, -1.0]), np.array([5.0, 15.0, 0.0]), np.array([1, 1, 0]), np.array([4, 0]))
+    speed_1, speed_2, occ_1, occ_2, flow_1, flow_2, queue = agg.emit()
+    assert (speed_1, speed_2) == (20.0, 0.0)
+    assert (occ_1, occ_2) == (10.0, 0.0)
+    assert (flow_1, flow_2) == (3 / 4 * 3600.0, 0.0)
+    assert queue == 1.5
+
+
+def test_call_sites_match_signatures():
+    # Every DetectorAggregator / IntervalAggregator call in the repository (scripts included)
+    # only uses keyword arguments the constructors accept
+    import ast
+    import inspect
+    from pathlib import Path
+    accepted = {cls.__name__: set(inspect.signature(cls).parameters)
+                for cls in (IntervalAggregator, DetectorAggregator)}
+    repo = Path(__file__).resolve().parents[2]
+    for path in repo.rglob("*.py"):
+        for node in ast.walk(ast.parse(path.read_text(), str(path))):
+            if isinstance(node, ast.Call) and getattr(node.func, "id", None) in accepted:
+                unknown = {k.arg for k in node.keywords} - accepted[node.func.id]
+                assert not unknown, f"{path}:{node.lineno} passes {unknown} to {node.func.id}"
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+import torch.multiprocessing as mp
+
+from dqn_model.dqn_agent import Agent
+from dqn_model.rollout import RolloutAgent
+
+
+def agents(epsilon):
+    agent = Agent(10, 2)
+    agent.epsilon = epsilon
+    shared = agent.model
+    worker = RolloutAgent(0, 0, shared, mp.Value('d', epsilon, lock=False), mp.Lock(), None, agent.gamma)
+    return agent, worker
+
+
+def test_worker_and_learner_select_actions_alike():
+    states = np.random.default_rng(0).random((50, 10), dtype=np.float32)
+    for epsilon in (0.0, 0.5, 1.0):
+        agent, worker = agents(epsilon)
+        np.random.seed(1)
+        learner_actions = [agent.act(s) for s in states]
+        np.random.seed(1)
+        worker_actions = [worker.act(s) for s in states]
+        assert learner_actions == worker_actions
+        assert list(agent.act_batch(states, epsilon=0.0)) == [agent.act_batch([s], 0.0)[0] for s in states]
+
+
+def test_double_dqn_needs_a_target_network():
+    with pytest.raises(ValueError):
+        Agent(10, 2, double=True)
+    assert Agent(10, 2, double=True, target_update=100).target_model is not None
+    assert Agent(10, 2, double=True, tau=0.01).target_model is not None
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from dqn_model.detector_registry import DetectorGroup, DetectorLayout, Ramp, load_layout
+from dqn_model.dqn_agent import DQN
+from dqn_model.env import (AVERAGE_KEYS, STATE_KEYS, STATE_SIZE, ACTION_SIZE, MAX_OCC, MAX_QUEUE,
+                           average_keys, averages_from, build_state, check_layout, check_state_layout)
+
+
+def layout(positions, ramps=1):
+    groups = [DetectorGroup(f"det_loc{i}", "edge", pos, [f"det_loc{i}_0"], ["edge_0"])
+              for i, pos in enumerate(positions)]
+    return DetectorLayout(groups, [Ramp(f"tl{i}", [f"ramp{i}_0"]) for i in range(ramps)])
+
+
+def test_network_layout_matches_training_schema():
+    assert average_keys(load_layout()) == AVERAGE_KEYS
+    check_layout(load_layout())
+
+
+def test_other_group_count_is_rejected():
+    keys = average_keys(layout([15.0, 225.0, 475.0, 700.0]))
+    assert len(keys) == 13 and keys[3] == 'speed700m'
+    with pytest.raises(ValueError):
+        check_layout(layout([15.0, 225.0, 475.0, 700.0]))
+    with pytest.raises(ValueError):
+        check_layout(layout([15.0, 225.0]))
+
+
+def test_more_than_one_ramp_is_rejected():
+    with pytest.raises(ValueError):
+        check_layout(layout([15.0, 225.0, 475.0], ramps=2))
+
+
+def test_averages_length_mismatch_is_rejected():
+    assert averages_from(range(10))['queue'] == 9.0
+    with pytest.raises(ValueError):
+        averages_from(range(13))
+
+
+def test_build_state_follows_state_keys():
+    averages = {k: float(i + 1) for i, k in enumerate(AVERAGE_KEYS)}
+    state = build_state(averages)
+    assert len(state) == STATE_SIZE == len(STATE_KEYS)
+    assert state[STATE_KEYS.index('occ225m')] == np.float32(averages['occ225m'] / MAX_OCC)
+    assert state[STATE_KEYS.index('queue')] == np.float32(averages['queue'] / MAX_QUEUE)
+
+
+def test_saved_network_shape_is_checked():
+    check_state_layout(DQN(STATE_SIZE, ACTION_SIZE).state_dict())
+    with pytest.raises(ValueError):
+        check_state_layout(DQN(STATE_SIZE + 3, ACTION_SIZE).state_dict())
+    with pytest.raises(ValueError):
+        check_state_layout(DQN(STATE_SIZE, ACTION_SIZE + 1).state_dict())
@@ -0,0 +1,77 @@
+import numpy as np
+
+from dqn_model.replay_buffer import SumTree, PrioritizedReplayBuffer
+
+STATE_SIZE = 3
+
+
+def check_tree(tree):
+    # Every internal node holds the sum of its children, the root the sum of all leaves
+    internal = np.arange(tree.num_leaves - 1)
+    np.testing.assert_allclose(tree.tree[internal], tree.tree[2 * internal + 1] + tree.tree[2 * internal + 2])
+    np.testing.assert_allclose(tree.total(), tree.get(np.arange(tree.capacity)).sum())
+
+
+def push(buffer, n, start=0):
+    for i in range(start, start + n):
+        state = np.full(STATE_SIZE, i, dtype=np.float32)
+        buffer.push(state, i % 2, float(i), state + 1, False)
+
+
+def test_total_is_sum_of_leaves_after_updates():
+    rng = np.random.default_rng(0)
+    tree = SumTree(13)  # Not a power of two
+    for _ in range(50):
+        indices = rng.integers(0, 13, size=rng.integers(1, 8))  # With duplicates
+        tree.update(indices, rng.random(len(indices)))
+        check_tree(tree)
+
+
+def test_find_is_proportional_to_priority():
+    priorities = np.array([1.0, 0.0, 3.0, 4.0, 2.0])
+    tree = SumTree(len(priorities))
+    tree.update(np.arange(len(priorities)), priorities)
+    # Evenly spread values over the total mass hit each leaf in proportion to its priority
+    n = 10000
+    values = (np.arange(n) + 0.5) / n * tree.total()
+    counts = np.bincount(tree.find(values), minlength=tree.num_leaves)
+    np.testing.assert_allclose(counts[:len(priorities)] / n, priorities / priorities.sum(), atol=1e-3)
+    assert counts[len(priorities):].sum() == 0
+
+
+def test_sampling_follows_priorities():
+    np.random.seed(0)
+    buffer = PrioritizedReplayBuffer(4, STATE_SIZE, alpha=1.0)
+    push(buffer, 4)
+    buffer.update_priorities(np.arange(4), np.array([1.0, 1.0, 2.0, 4.0]) - buffer.eps)
+    draws = np.concatenate([buffer.sample_indices(8) for _ in range(2000)])
+    np.testing.assert_allclose(np.bincount(draws) / len(draws), [0.125, 0.125, 0.25, 0.5], atol=0.02)
+
+
+def test_wrap_around_overwrites_priorities():
+    buffer = PrioritizedReplayBuffer(5, STATE_SIZE, alpha=1.0)
+    push(buffer, 5)
+    buffer.update_priorities(np.arange(5), np.full(5, 0.5) - buffer.eps)
+    buffer.update_priorities([4], [3.0 - buffer.eps])
+    check_tree(buffer.tree)
+
+    # Three more transitions overwrite slots 0-2 with the highest priority seen so far
+    push(buffer, 3, start=5)
+    assert (buffer.pos, buffer.size) == (3, 5)
+    np.testing.assert_allclose(buffer.tree.get(np.arange(5)), [3.0, 3.0, 3.0, 0.5, 3.0])
+    assert list(buffer.rewards[:5]) == [5.0, 6.0, 7.0, 3.0, 4.0]
+    check_tree(buffer.tree)
+
+    # extend() wraps the same way
+    states = np.zeros((4, STATE_SIZE), dtype=np.float32)
+    indices = buffer.extend(states, np.zeros(4), np.zeros(4), states, np.zeros(4))
+    assert list(indices) == [3, 4, 0, 1]
+    assert buffer.pos == 2
+    check_tree(buffer.tree)
+
+
+def test_partial_buffer_samples_only_valid_slots():
+    np.random.seed(1)
+    buffer = PrioritizedReplayBuffer(8, STATE_SIZE)
+    push(buffer, 3)
+    assert buffer.sample_indices(64).max() < 3
@@ -0,0 +1,11 @@
+import pytest
+
+from dqn_model.dqn_agent import Agent
+from dqn_model.rollout import train_parallel
+
+
+def test_worker_error_reaches_the_learner(monkeypatch):
+    # warmup_steps not a multiple of the control interval: every worker's env raises
+    monkeypatch.setenv("SUMO_BACKEND", "replay")
+    with pytest.raises(RuntimeError, match="warmup_steps"):
+        list(train_parallel(Agent(10, 2), 2, 2, warmup_steps=7))
@@ -0,0 +1,28 @@
+import multiprocessing as mp
+import pytest
+
+from dqn_model.evaluate import _evaluate_run
+
+SEED = 3
+ENV_KWARGS = {"warmup_steps": 300, "max_steps": 900}
+
+
+@pytest.mark.parametrize("backend", ["traci", "libsumo"])
+def test_snapshot_episode_is_reproducible(backend, monkeypatch):
+    # Same seed, same (no-control) actions, from the same warmup snapshot: same TTS.
+    # Every episode runs in a fresh process, as in evaluate.py (see snapshots.py)
+    pytest.importorskip("libsumo")
+    monkeypatch.setenv("SUMO_BACKEND", backend)
+    jobs = [("no_control", None, SEED, ENV_KWARGS)] * 3
+    with mp.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        tts = [result["tts"] for _, _, result in pool.map(_evaluate_run, jobs)]
+    assert tts[0] == tts[1] == tts[2]
+
+
+def test_overriding_selected_traci_warns(monkeypatch):
+    pytest.importorskip("libsumo")
+    from dqn_model import sim_backend
+    monkeypatch.setattr(sim_backend, "_states_loaded", 0)
+    monkeypatch.setenv("SUMO_BACKEND", "traci")
+    with pytest.warns(RuntimeWarning, match="traci backend was selected"):
+        assert sim_backend._state_backend("traci", gui=False) == "libsumo"
@@ -0,0 +1,65 @@
+import numpy as np
+from types import SimpleNamespace
+
+from dqn_model.detector_registry import load_layout
+from dqn_model.env import compute_reward
+from dqn_model.trace import TraceWriter, TraceReader
+
+INTERVAL = 3
+STEPS = 4 * INTERVAL
+
+
+def sensors(layout, step):
+    n_det, n_lane = len(layout.detector_ids), len(layout.ramp_lanes)
+    return SimpleNamespace(speeds=np.full(n_det, 20.0 + step, dtype=np.float32),
+                           occupancies=np.full(n_det, float(step), dtype=np.float32),
+                           counts=np.full(n_det, step % 2, dtype=np.int16),
+                           halting=np.full(n_lane, step, dtype=np.int16))
+
+
+def write_episode(writer, layout, offset=0):
+    writer.begin_episode()
+    for step in range(STEPS):
+        writer.append(step, step // INTERVAL % 2, 0, 10 * step + offset, sensors(layout, step))
+    writer.append(STEPS, -1, -1, 0, sensors(layout, STEPS))
+
+
+def test_round_trip(tmp_path):
+    layout = load_layout()
+    path = str(tmp_path / "run.trace")
+    writer = TraceWriter(path, layout, control_interval=INTERVAL, alpha=500.0, beta=100.0)
+    write_episode(writer, layout)
+    writer.close()
+    # A second writer appends, continuing the episode numbering
+    writer = TraceWriter(path, layout, control_interval=INTERVAL)
+    write_episode(writer, layout, offset=1)
+    writer.close()
+
+    reader = TraceReader(path)
+    assert len(reader) == 2 * (STEPS + 1)
+    assert reader.detector_ids == layout.detector_ids and reader.group_sizes == layout.group_sizes
+    first, second = reader.episodes()
+    assert list(first["episode"]) == [0] * (STEPS + 1) and list(second["episode"]) == [1] * (STEPS + 1)
+    assert list(first["step"]) == list(range(STEPS + 1))
+    assert first["action"][-1] == -1
+    np.testing.assert_array_equal(first["halting"][5], sensors(layout, 5).halting)
+    np.testing.assert_array_equal(first["speeds"][7], sensors(layout, 7).speeds)
+
+    tts = reader.interval_tts(second, INTERVAL)
+    assert list(tts) == [sum(10 * s + 1 for s in range(i * INTERVAL, (i + 1) * INTERVAL)) for i in range(4)]
+
+
+def test_rewards_use_recorded_calibration(tmp_path):
+    layout = load_layout()
+    path = str(tmp_path / "run.trace")
+    writer = TraceWriter(path, layout, control_interval=INTERVAL, alpha=500.0, beta=100.0)
+    write_episode(writer, layout)
+    writer.close()
+
+    reader = TraceReader(path)
+    assert reader.calibration(INTERVAL) == (500.0, 100.0)
+    states, actions, rewards, next_states, dones = reader.transitions(INTERVAL)
+    tts = reader.interval_tts(reader.episodes()[0], INTERVAL)
+    np.testing.assert_allclose(rewards, [compute_reward(t, 500.0, 100.0) for t in tts[1:]], rtol=1e-6)
+    assert list(actions) == [1, 0, 1]
+    np.testing.assert_array_equal(states[1:], next_states[:-1])